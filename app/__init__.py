@@ -1,33 +1,70 @@
 import os
 from datetime import timedelta
 
-import secrets
-from flask import Flask
+from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_login import LoginManager
 from flask_sqlalchemy import SQLAlchemy
 from flask_session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
 
-from app.utils.utils import ensure_dir_exists
+from app.utils.admission import UpstreamBusy, upstream_limiter
+from app.utils.anilist import use_async_client
+from app.utils.cache_manager import cache_manager, default_areas, start_pruner
+from app.utils.http import init_compression
+from app.utils.images import HttpImageSource, thumbnail_cache
+from app.utils.log import configure_logging, parse_levels
+from app.utils.metrics import start_periodic_dump
+from app.utils.passwords import HasherBusy, password_hasher
+from app.utils.profiling import init_profiling
+from app.utils.sessions import create_session_interface
+from app.utils.user_cache import user_cache
+from app.utils.warm_cache import start_snapshotter, warm_cache
+from app.utils.utils import ensure_dir_exists, load_or_create_secret
 
 # Initialize extensions before app creation (without binding to specific app)
 db = SQLAlchemy()
 login_manager = LoginManager()
 sess = Session()
 
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers in other worker processes proceed while one of them writes
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
 def create_app(test_config=None):
     # Initialize Flask app
     app = Flask(__name__, static_folder="../frontend/build", static_url_path="/")
 
     # Configure the app
-    app.config["SECRET_KEY"] = secrets.token_hex(16)
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///anime_quiz.db"
+    # Sessions are signed with this key, so every worker process must use the same
+    # one: it comes from SECRET_KEY or from a key file created once in instance/
+    os.makedirs(app.instance_path, exist_ok=True)
+    app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY") or load_or_create_secret(
+        os.path.join(app.instance_path, "secret_key")
+    )
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
+        "DATABASE_URL", "sqlite:///anime_quiz.db"
+    )
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # wait for locks held by other workers instead of failing right away
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"connect_args": {"timeout": 30}}
 
-    # Ensure the session directory exists
-    os.makedirs("flask_session", exist_ok=True)
+    # Number of worker processes the app is served with (see gunicorn.conf.py)
+    app.config["WORKERS"] = int(os.environ.get("WORKERS", 1))
 
     # Session configuration
+    # "sqlite" (default) or "memory" use compact server-side sessions,
+    # "filesystem" keeps the Flask-Session file store in flask_session/
+    app.config["SESSION_BACKEND"] = os.environ.get("SESSION_BACKEND", "sqlite")
+    app.config["SESSION_SQLITE_PATH"] = "./data/sessions.db"
+    app.config["SESSION_MAX_BYTES"] = 256 * 1024
+    app.config["SESSION_SWEEP_INTERVAL"] = 300  # in seconds
     app.config["SESSION_TYPE"] = "filesystem"
     app.config["SESSION_FILE_DIR"] = "flask_session"
     app.config["SESSION_PERMANENT"] = True
@@ -37,36 +74,236 @@ def create_app(test_config=None):
     app.config["SESSION_COOKIE_SAMESITE"] = "Lax"
     app.config["SESSION_USE_SIGNER"] = True
 
+    # AniList client: "sync" (requests) or "async" (aiohttp, one shared event loop)
+    app.config["ANILIST_CLIENT"] = os.environ.get("ANILIST_CLIENT", "sync")
+    app.config["ANILIST_MAX_CONCURRENCY"] = int(
+        os.environ.get("ANILIST_MAX_CONCURRENCY", 8)
+    )
+
+    # Admission control for cold AniList fetches (cache hits are never limited)
+    app.config["UPSTREAM_MAX_CONCURRENT"] = int(
+        os.environ.get("UPSTREAM_MAX_CONCURRENT", 4)
+    )
+    app.config["UPSTREAM_MAX_QUEUE"] = int(os.environ.get("UPSTREAM_MAX_QUEUE", 8))
+    app.config["UPSTREAM_QUEUE_TIMEOUT"] = 2.0  # in seconds
+    app.config["UPSTREAM_RETRY_AFTER"] = 5  # in seconds
+
+    # Password hashing, in a pool of PASSWORD_WORKERS processes per worker (0 hashes
+    # in the request thread); hashes made with another method are upgraded at login
+    app.config["PASSWORD_METHOD"] = os.environ.get(
+        "PASSWORD_METHOD", "pbkdf2:sha256:600000"
+    )
+    app.config["PASSWORD_WORKERS"] = int(
+        os.environ.get("PASSWORD_WORKERS", min(4, os.cpu_count() or 1))
+    )
+    app.config["PASSWORD_MAX_PENDING"] = int(os.environ.get("PASSWORD_MAX_PENDING", 16))
+    app.config["PASSWORD_QUEUE_TIMEOUT"] = 5.0  # in seconds
+    app.config["PASSWORD_RETRY_AFTER"] = 2  # in seconds
+
+    # Seconds a user loaded for a request is reused by the next ones of the same
+    # worker (0 loads it from the database every time)
+    app.config["USER_CACHE_TTL"] = float(os.environ.get("USER_CACHE_TTL", 30))
+    app.config["USER_CACHE_SIZE"] = 1024
+
+    # Thumbnail proxy for AniList images (off by default)
+    app.config["IMAGE_PROXY"] = os.environ.get("IMAGE_PROXY", "0") == "1"
+    app.config["IMAGE_PROXY_DIR"] = "./data/thumbnails/"
+    app.config["IMAGE_PROXY_MAX_BYTES"] = int(
+        os.environ.get("IMAGE_PROXY_MAX_BYTES", 256 * 1024 * 1024)
+    )
+    app.config["IMAGE_PROXY_SIZE"] = 160  # longest side, in pixels
+    app.config["IMAGE_PROXY_ALLOWED_HOSTS"] = [
+        host.strip()
+        for host in os.environ.get(
+            "IMAGE_PROXY_ALLOWED_HOSTS", "s4.anilist.co,img.anili.st"
+        ).split(",")
+        if host.strip()
+    ]
+
+    # Disk budget of data/ caches, exports, thumbnails and session files
+    app.config["CACHE_MAX_BYTES"] = int(os.environ.get("CACHE_MAX_BYTES", 1024**3))
+    # seconds between prunes (0 disables them, `flask cache prune` still works)
+    app.config["CACHE_PRUNE_INTERVAL"] = int(
+        os.environ.get("CACHE_PRUNE_INTERVAL", 3600)
+    )
+
+    # Compiled game indexes and leaderboard kept in memory and saved to a
+    # snapshot file (at exit and every SNAPSHOT_INTERVAL seconds) for restarts
+    app.config["WARM_CACHE_SIZE"] = int(os.environ.get("WARM_CACHE_SIZE", 256))
+    app.config["SNAPSHOT_PATH"] = os.environ.get(
+        "SNAPSHOT_PATH", "./data/warm_snapshot.bin"
+    )
+    app.config["SNAPSHOT_INTERVAL"] = int(os.environ.get("SNAPSHOT_INTERVAL", 600))
+
+    # Data-driven difficulty: non-main characters found in fewer than this share
+    # of the finished games of their anime are left out of new games (0 disables
+    # it), once they have been seen in DIFFICULTY_MIN_GAMES games
+    app.config["DIFFICULTY_MIN_GUESS_RATE"] = float(
+        os.environ.get("DIFFICULTY_MIN_GUESS_RATE", 0)
+    )
+    app.config["DIFFICULTY_MIN_GAMES"] = int(os.environ.get("DIFFICULTY_MIN_GAMES", 20))
+    # share of the cut characters still put in each game, so that their guess
+    # rates keep being measured and can get back over the cut
+    app.config["DIFFICULTY_EXPLORE_RATE"] = float(
+        os.environ.get("DIFFICULTY_EXPLORE_RATE", 0.1)
+    )
+
+    # Compression of JSON responses (gzip, or brotli when installed)
+    app.config["COMPRESSION"] = os.environ.get("COMPRESSION", "1") == "1"
+    app.config["COMPRESS_MIN_BYTES"] = 1024
+    app.config["COMPRESS_LEVEL"] = 6
+
+    # Request profiling: with PROFILING=1 requests run under cProfile and the dumps
+    # of a PROFILE_SAMPLE_RATE fraction of them, and of every request over
+    # PROFILE_THRESHOLD_MS, are kept in PROFILE_DIR; requests with a signed
+    # X-Profile header are always profiled and kept
+    app.config["PROFILING"] = os.environ.get("PROFILING", "0") == "1"
+    app.config["PROFILE_SAMPLE_RATE"] = float(
+        os.environ.get("PROFILE_SAMPLE_RATE", 0.01)
+    )
+    app.config["PROFILE_THRESHOLD_MS"] = int(
+        os.environ.get("PROFILE_THRESHOLD_MS", 500)
+    )
+    app.config["PROFILE_DIR"] = os.environ.get("PROFILE_DIR", "./data/profiles/")
+    app.config["PROFILE_MAX_FILES"] = int(os.environ.get("PROFILE_MAX_FILES", 200))
+    app.config["PROFILE_TOKEN_MAX_AGE"] = 3600  # in seconds
+
+    # Logging configuration (JSON records on stderr)
+    app.config["LOG_LEVEL"] = os.environ.get("LOG_LEVEL", "INFO").upper()
+    app.config["LOG_LEVELS"] = parse_levels(os.environ.get("LOG_LEVELS", ""))
+    app.config["LOG_QUEUE"] = os.environ.get("LOG_QUEUE", "0") == "1"
+
+    # Observability configuration
+    app.config["ADMIN_USERNAMES"] = {
+        name.strip()
+        for name in os.environ.get("ADMIN_USERNAMES", "").split(",")
+        if name.strip()
+    }
+    # seconds between AniList metrics summaries (0 disables them)
+    app.config["METRICS_DUMP_INTERVAL"] = int(
+        os.environ.get("METRICS_DUMP_INTERVAL", 0)
+    )
+
+    # Overrides for tests and benchmarks (e.g. a throwaway database)
+    if test_config is not None:
+        app.config.update(test_config)
+
+    if app.config["WORKERS"] > 1 and app.config["SESSION_BACKEND"] == "memory":
+        raise ValueError(
+            "The memory session backend cannot be shared between workers, "
+            "use SESSION_BACKEND=sqlite when WORKERS > 1"
+        )
+
+    configure_logging(app)
+
+    # Ensure data directories exist
+    ensure_dir_exists("./data/characters/")
+    ensure_dir_exists("./data/users/")
+    ensure_dir_exists("./data/games/")
+
     # Initialize extensions with the app
     db.init_app(app)
     login_manager.init_app(app)
-    sess.init_app(app)
+    if app.config["SESSION_BACKEND"] == "filesystem":
+        os.makedirs(app.config["SESSION_FILE_DIR"], exist_ok=True)
+        sess.init_app(app)
+    else:
+        app.session_interface = create_session_interface(app)
+
+    init_compression(app)
+    init_profiling(app)
 
     # Enable CORS with credentials support
     CORS(app, supports_credentials=True, resources={r"/api/*": {"origins": "*"}})
 
-    # Ensure data directories exist
-    ensure_dir_exists("./data/characters/")
-    ensure_dir_exists("./data/users/")
-    ensure_dir_exists("./data/games/")
+    start_periodic_dump(app.config["METRICS_DUMP_INTERVAL"])
+
+    if app.config["ANILIST_CLIENT"] == "async":
+        use_async_client(app.config["ANILIST_MAX_CONCURRENCY"])
+
+    upstream_limiter.configure(
+        max_concurrent=app.config["UPSTREAM_MAX_CONCURRENT"],
+        max_queue=app.config["UPSTREAM_MAX_QUEUE"],
+        queue_timeout=app.config["UPSTREAM_QUEUE_TIMEOUT"],
+        retry_after=app.config["UPSTREAM_RETRY_AFTER"],
+    )
+
+    password_hasher.configure(
+        method=app.config["PASSWORD_METHOD"],
+        workers=app.config["PASSWORD_WORKERS"],
+        max_pending=app.config["PASSWORD_MAX_PENDING"],
+        queue_timeout=app.config["PASSWORD_QUEUE_TIMEOUT"],
+        retry_after=app.config["PASSWORD_RETRY_AFTER"],
+    )
+
+    user_cache.configure(app.config["USER_CACHE_TTL"], app.config["USER_CACHE_SIZE"])
+
+    if app.config["IMAGE_PROXY"]:
+        thumbnail_cache.configure(
+            directory=app.config["IMAGE_PROXY_DIR"],
+            source=HttpImageSource(app.config["IMAGE_PROXY_ALLOWED_HOSTS"]),
+            max_bytes=app.config["IMAGE_PROXY_MAX_BYTES"],
+            size=app.config["IMAGE_PROXY_SIZE"],
+        )
+
+    warm_cache.configure(
+        app.config["SNAPSHOT_PATH"] or None, app.config["WARM_CACHE_SIZE"]
+    )
+    start_snapshotter(warm_cache, app.config["SNAPSHOT_INTERVAL"])
+
+    cache_manager.configure(default_areas(app.config), app.config["CACHE_MAX_BYTES"])
+    start_pruner(cache_manager, app.config["CACHE_PRUNE_INTERVAL"])
+
+    @app.errorhandler(UpstreamBusy)
+    def upstream_busy(e):
+        response = jsonify({"error": "AniList is busy right now, try again shortly"})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 503
+
+    @app.errorhandler(HasherBusy)
+    def hasher_busy(e):
+        response = jsonify({"error": "Too many logins right now, try again shortly"})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 503
 
     with app.app_context():
         # Import models to ensure they're known to SQLAlchemy
-        # from app.models.user import User
-        # from app.models.game import Game, Guess
+        from app.models.user import User  # noqa: F401
+        from app.models.game import Game, Guess, GuessArchive  # noqa: F401
+        from app.models.stats import CharacterStat, UserStats  # noqa: F401
+
+        if db.engine.dialect.name == "sqlite":
+            event.listen(db.engine, "connect", _set_sqlite_pragmas)
 
-        # Create database tables
-        db.create_all()
+        # Create database tables (workers booting together may race to create
+        # them; create_all skips the tables that exist by the time it retries)
+        for attempt in range(3):
+            try:
+                db.create_all()
+                break
+            except OperationalError:
+                if attempt == 2:
+                    raise
 
         # Import and register blueprints
         from app.routes.auth import auth_bp
         from app.routes.user import user_bp
         from app.routes.game import game_bp
         from app.routes.main import main_bp
+        from app.routes.admin import admin_bp
+        from app.routes.images import images_bp
 
         app.register_blueprint(auth_bp)
         app.register_blueprint(user_bp)
         app.register_blueprint(game_bp)
         app.register_blueprint(main_bp)
+        app.register_blueprint(admin_bp)
+        app.register_blueprint(images_bp)
+
+        from app.cli import cache_cli, games_cli, stats_cli
+
+        app.cli.add_command(cache_cli)
+        app.cli.add_command(stats_cli)
+        app.cli.add_command(games_cli)
 
         return app
@@ -0,0 +1,149 @@
+import json
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func
+
+from app.utils.anilist import (
+    get_animes_from_user,
+    get_characters_from_anime,
+    prepare_for_game_anilist,
+)
+from app.utils.cache_manager import cache_manager
+from app.utils.configs import guess_archive_after
+from app.utils.negative_cache import negative_cache
+from app.utils.warm_cache import warm_cache
+
+cache_cli = AppGroup("cache", help="Inspect and manage the on-disk caches.")
+stats_cli = AppGroup("stats", help="Maintain the per-user statistics.")
+games_cli = AppGroup("games", help="Maintain the game history.")
+
+
+def most_played(limit: int) -> list[int]:
+    """Returns the ids of the `limit` anime with the most games."""
+    from app.models.game import Game
+
+    if limit <= 0:
+        return []
+
+    rows = (
+        Game.query.with_entities(Game.anime_id)
+        .group_by(Game.anime_id)
+        .order_by(func.count(Game.id).desc())
+        .limit(limit)
+        .all()
+    )
+    return [row.anime_id for row in rows]
+
+
+@cache_cli.command("stats")
+def cache_stats():
+    """Show the number of files, size and oldest access of every cache area."""
+    click.echo(json.dumps(cache_manager.stats(), indent=2))
+
+
+@cache_cli.command("prune")
+@click.option("--dry-run", is_flag=True, help="Only report what would be removed.")
+def cache_prune(dry_run):
+    """Remove expired entries, then least recently used ones if over budget."""
+    result = cache_manager.prune(dry_run=dry_run)
+    if not dry_run:
+        result["negative"] = negative_cache.sweep()
+    click.echo(json.dumps(result, indent=2))
+
+
+@cache_cli.command("warm")
+@click.option("--anime-id", type=int, multiple=True, help="Cast to fetch.")
+@click.option("--user", multiple=True, help="AniList watchlist to fetch.")
+@click.option(
+    "--top",
+    type=int,
+    default=0,
+    help="Also fetch the casts of the N most played anime.",
+)
+def cache_warm(anime_id, user, top):
+    """Fetch AniList data ahead of time so the first players do not wait for it."""
+    anime_ids = list(anime_id)
+    anime_ids += [
+        current_id for current_id in most_played(top) if current_id not in anime_ids
+    ]
+
+    for username in user:
+        try:
+            get_animes_from_user(username)
+            click.echo(f"user {username}: ok")
+        except Exception as e:
+            click.echo(f"user {username}: failed ({e!r})", err=True)
+
+    for current_id in anime_ids:
+        try:
+            characters = get_characters_from_anime(current_id)["data"]
+            click.echo(f"anime {current_id}: {len(characters)} characters")
+        except Exception as e:
+            click.echo(f"anime {current_id}: failed ({e!r})", err=True)
+
+
+@cache_cli.command("snapshot")
+@click.option(
+    "--top",
+    type=int,
+    default=50,
+    help="Compile the game indexes of the N most played anime first.",
+)
+def cache_snapshot(top):
+    """Write the warm-start snapshot loaded by restarted workers."""
+    from app.routes.game import top_games_leaderboard
+
+    for current_id in most_played(top):
+        try:
+            prepare_for_game_anilist(anime_id=current_id, favourite_cut=5)
+        except Exception as e:
+            click.echo(f"anime {current_id}: failed ({e!r})", err=True)
+
+    top_games_leaderboard()
+    click.echo(f"saved {warm_cache.save()} entries to {warm_cache.path}")
+
+
+@stats_cli.command("rebuild")
+@click.option("--user-id", type=int, multiple=True, help="Only rebuild these users.")
+def stats_rebuild(user_id):
+    """Recompute per-user statistics from the game history."""
+    from app import db
+    from app.models.stats import rebuild_user_stats
+    from app.models.user import User
+
+    user_ids = list(user_id) or [row.id for row in User.query.with_entities(User.id)]
+    for current_id in user_ids:
+        rebuild_user_stats(current_id)
+    db.session.commit()
+    click.echo(f"rebuilt stats of {len(user_ids)} users")
+
+
+@games_cli.command("archive")
+@click.option(
+    "--days",
+    type=int,
+    default=guess_archive_after,
+    show_default=True,
+    help="Archive the guesses of games completed more than this many days ago.",
+)
+@click.option("--batch-size", type=int, default=200, show_default=True)
+@click.option(
+    "--vacuum", is_flag=True, help="Then give the freed space back (SQLite only)."
+)
+def games_archive(days, batch_size, vacuum):
+    """Pack the guesses of old completed games into one row per game."""
+    from app import db
+    from app.models.game import archive_guesses
+
+    archived = archive_guesses(datetime.utcnow() - timedelta(days=days), batch_size)
+    click.echo(f"archived the guesses of {archived} games")
+
+    if vacuum and db.engine.dialect.name == "sqlite":
+        # VACUUM cannot run inside a transaction
+        with db.engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            conn.exec_driver_sql("VACUUM")
+        click.echo("vacuumed the database")
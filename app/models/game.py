@@ -1,4 +1,7 @@
-from datetime import datetime
+import json
+import zlib
+from datetime import datetime, timedelta
+
 from app import db
 
 
@@ -15,6 +18,14 @@ class Game(db.Model):
     score = db.Column(db.Integer, nullable=False, default=0)
     completed = db.Column(db.Boolean, nullable=False, default=False)
     guesses = db.relationship("Guess", backref="game", lazy=True)
+    # guesses of old completed games, packed by `archive_guesses`
+    archive = db.relationship("GuessArchive", uselist=False, lazy=True)
+
+    def guess_history(self):
+        """Returns the guesses of the game in order, whether archived or not."""
+        if self.archive is not None:
+            return self.archive.unpack(self.start_time)
+        return [guess.to_dict() for guess in self.guesses]
 
     def to_dict(self):
         return {
@@ -31,7 +42,7 @@ class Game(db.Model):
             "duration": (self.end_time - self.start_time).total_seconds()
             if self.end_time
             else None,
-            "guesses": [guess.to_dict() for guess in self.guesses],
+            "guesses": self.guess_history(),
         }
 
 
@@ -51,3 +62,91 @@ class Guess(db.Model):
             "is_correct": self.is_correct,
             "character_name": self.character_name,
         }
+
+
+class GuessArchive(db.Model):
+    """
+    The guesses of a completed game packed into a single row, in place of its
+    Guess rows (see `archive_guesses`).
+
+    `data` is zlib-compressed JSON: one `[id, offset, is_correct, guess_text,
+    character_name]` list per guess, in order, where `offset` is the number of
+    microseconds between the start of the game and the guess.
+    """
+
+    game_id = db.Column(db.Integer, db.ForeignKey("game.id"), primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+
+    @classmethod
+    def pack(cls, game, guesses):
+        rows = [
+            [
+                guess.id,
+                (guess.timestamp - game.start_time) // timedelta(microseconds=1),
+                guess.is_correct,
+                guess.guess_text,
+                guess.character_name,
+            ]
+            for guess in sorted(guesses, key=lambda guess: guess.id)
+        ]
+        return cls(
+            game_id=game.id,
+            data=zlib.compress(json.dumps(rows, separators=(",", ":")).encode()),
+        )
+
+    def unpack(self, start_time):
+        """Returns the guesses as `Guess.to_dict` would."""
+        return [
+            {
+                "id": guess_id,
+                "guess_text": guess_text,
+                "timestamp": (start_time + timedelta(microseconds=offset)).isoformat(),
+                "is_correct": is_correct,
+                "character_name": character_name,
+            }
+            for guess_id, offset, is_correct, guess_text, character_name in json.loads(
+                zlib.decompress(self.data)
+            )
+        ]
+
+
+def archive_guesses(before, batch_size=200):
+    """
+    Packs the guesses of the games completed before a date into GuessArchive rows
+    and deletes their Guess rows, one committed batch of games at a time.
+
+    Args:
+        before (datetime): Games that ended before this are archived.
+        batch_size (int): Games packed per transaction.
+
+    Returns:
+        int: The number of games archived.
+    """
+    archived = 0
+    while True:
+        games = (
+            Game.query.outerjoin(GuessArchive)
+            .filter(
+                Game.completed.is_(True),
+                Game.end_time < before,
+                GuessArchive.game_id.is_(None),
+            )
+            .order_by(Game.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not games:
+            return archived
+
+        game_ids = [game.id for game in games]
+        guesses = {game_id: [] for game_id in game_ids}
+        for guess in Guess.query.filter(Guess.game_id.in_(game_ids)):
+            guesses[guess.game_id].append(guess)
+
+        for game in games:
+            db.session.add(GuessArchive.pack(game, guesses[game.id]))
+        Guess.query.filter(Guess.game_id.in_(game_ids)).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+        archived += len(games)
@@ -0,0 +1,245 @@
+from sqlalchemy import case, func, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.game import Game
+
+
+class UserStats(db.Model):
+    """
+    Running totals of a user's games, updated in the same transaction as the
+    games and guesses they summarize (see `rebuild_user_stats` to recompute them).
+    """
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    games_played = db.Column(db.Integer, nullable=False, default=0)
+    games_completed = db.Column(db.Integer, nullable=False, default=0)
+    # sum of the final scores of completed games
+    completed_score = db.Column(db.Integer, nullable=False, default=0)
+    total_guesses = db.Column(db.Integer, nullable=False, default=0)
+    correct_guesses = db.Column(db.Integer, nullable=False, default=0)
+    play_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    best_score = db.Column(db.Integer, nullable=True)
+    best_anime_id = db.Column(db.Integer, nullable=True)
+    best_anime_title = db.Column(db.String(200), nullable=True)
+
+    @classmethod
+    def for_user(cls, user_id: int) -> "UserStats":
+        """
+        Returns the stats row of a user, creating it from their game history if
+        missing.
+        """
+        stats = db.session.get(cls, user_id)
+        if stats is None:
+            stats = rebuild_user_stats(user_id)
+        return stats
+
+    # The record_* methods run a single UPDATE (SET x = x + 1), so that the hot
+    # path needs no SELECT and concurrent requests of the same user do not
+    # overwrite each other. A user without a row yet gets it rebuilt from their
+    # history instead, so call them after the game changes they record.
+
+    @classmethod
+    def _increment(cls, user_id: int, **values) -> None:
+        result = db.session.execute(
+            update(cls)
+            .where(cls.user_id == user_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            # the history already includes the change being recorded
+            rebuild_user_stats(user_id)
+
+    @classmethod
+    def record_game_started(cls, user_id: int) -> None:
+        cls._increment(user_id, games_played=cls.games_played + 1)
+
+    @classmethod
+    def record_guess(cls, user_id: int, is_correct: bool) -> None:
+        cls._increment(
+            user_id,
+            total_guesses=cls.total_guesses + 1,
+            correct_guesses=cls.correct_guesses + int(is_correct),
+        )
+
+    @classmethod
+    def record_game_completed(cls, game: Game) -> None:
+        # every right-hand side sees the row as it was before the update
+        is_best = (cls.best_score.is_(None)) | (cls.best_score < game.score)
+        cls._increment(
+            game.user_id,
+            games_completed=cls.games_completed + 1,
+            completed_score=cls.completed_score + game.score,
+            play_seconds=cls.play_seconds
+            + (game.end_time - game.start_time).total_seconds(),
+            best_anime_id=case((is_best, game.anime_id), else_=cls.best_anime_id),
+            best_anime_title=case(
+                (is_best, game.anime_title), else_=cls.best_anime_title
+            ),
+            best_score=case((is_best, game.score), else_=cls.best_score),
+        )
+
+    def to_dict(self):
+        return {
+            "games_played": self.games_played,
+            "games_completed": self.games_completed,
+            "completion_rate": self.games_completed / self.games_played
+            if self.games_played
+            else 0.0,
+            "average_score": self.completed_score / self.games_completed
+            if self.games_completed
+            else 0.0,
+            "total_guesses": self.total_guesses,
+            "correct_guesses": self.correct_guesses,
+            "accuracy": self.correct_guesses / self.total_guesses
+            if self.total_guesses
+            else 0.0,
+            "play_time_seconds": self.play_seconds,
+            "best_anime": {
+                "anime_id": self.best_anime_id,
+                "anime_title": self.best_anime_title,
+                "score": self.best_score,
+            }
+            if self.best_score is not None
+            else None,
+        }
+
+
+def _history_totals(user_id: int) -> dict:
+    games_played, total_guesses, correct_guesses = (
+        db.session.query(
+            func.count(Game.id),
+            func.coalesce(func.sum(Game.total_guesses), 0),
+            func.coalesce(func.sum(Game.correct_guesses), 0),
+        )
+        .filter(Game.user_id == user_id)
+        .one()
+    )
+    completed = (
+        Game.query.filter_by(user_id=user_id, completed=True)
+        .order_by(Game.score.desc(), Game.end_time)
+        .all()
+    )
+    best = completed[0] if completed else None
+
+    return {
+        "games_played": games_played,
+        "games_completed": len(completed),
+        "completed_score": sum(game.score for game in completed),
+        "total_guesses": total_guesses,
+        "correct_guesses": correct_guesses,
+        "play_seconds": sum(
+            (game.end_time - game.start_time).total_seconds()
+            for game in completed
+            if game.end_time
+        ),
+        "best_score": best.score if best else None,
+        "best_anime_id": best.anime_id if best else None,
+        "best_anime_title": best.anime_title if best else None,
+    }
+
+
+def rebuild_user_stats(user_id: int) -> UserStats:
+    """
+    Recomputes the stats of a user from their games (the caller commits).
+
+    Args:
+        user_id (int): The user whose stats are rebuilt.
+
+    Returns:
+        UserStats: The rebuilt stats row.
+    """
+    totals = _history_totals(user_id)
+
+    stats = db.session.get(UserStats, user_id)
+    if stats is not None:
+        for name, value in totals.items():
+            setattr(stats, name, value)
+        return stats
+
+    stats = UserStats(user_id=user_id, **totals)
+    try:
+        # another request of the same user may be creating it too
+        with db.session.begin_nested():
+            db.session.add(stats)
+    except IntegrityError:
+        stats = db.session.get(UserStats, user_id)
+    return stats
+
+
+class CharacterStat(db.Model):
+    """
+    How often players find a character, over all finished games of its anime.
+    """
+
+    anime_id = db.Column(db.Integer, primary_key=True)
+    # AniList character id
+    character_id = db.Column(db.Integer, primary_key=True)
+    # finished games in which the character was guessed
+    times_guessed = db.Column(db.Integer, nullable=False, default=0)
+    # finished games in which the character could be guessed
+    games_seen = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def guess_rate(self) -> float:
+        return self.times_guessed / self.games_seen if self.games_seen else 0.0
+
+    def to_dict(self):
+        return {
+            "character_id": self.character_id,
+            "times_guessed": self.times_guessed,
+            "games_seen": self.games_seen,
+            "guess_rate": self.guess_rate,
+        }
+
+
+def record_characters_seen(
+    anime_id: int, map_index_to_infos: dict, guessed_indexes: list[int]
+) -> None:
+    """
+    Counts a finished game in the stats of the characters it had (the caller commits).
+
+    Args:
+        anime_id (int): The anime of the game.
+        map_index_to_infos (dict): The game's characters, as stored in the session.
+        guessed_indexes (list[int]): Indexes of the characters found by the player.
+    """
+    guessed = {str(idx) for idx in guessed_indexes}
+    rows = [
+        {
+            "anime_id": anime_id,
+            "character_id": infos["id"],
+            "times_guessed": int(idx in guessed),
+            "games_seen": 1,
+        }
+        for idx, infos in map_index_to_infos.items()
+        # games started before characters had ids in the session
+        if "id" in infos
+    ]
+    if not rows:
+        return
+
+    # one upsert per game rather than a read-modify-write per character
+    dialect = postgresql if db.engine.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(CharacterStat).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CharacterStat.anime_id, CharacterStat.character_id],
+        set_={
+            "times_guessed": CharacterStat.times_guessed + stmt.excluded.times_guessed,
+            "games_seen": CharacterStat.games_seen + 1,
+        },
+    )
+    db.session.execute(stmt)
+
+
+def character_guess_rates(anime_id: int, min_games: int) -> dict[int, float]:
+    """
+    Returns the guess rate of the characters of an anime seen in at least
+    `min_games` finished games, by character id.
+    """
+    rows = CharacterStat.query.filter(
+        CharacterStat.anime_id == anime_id, CharacterStat.games_seen >= min_games
+    ).all()
+    return {row.character_id: row.guess_rate for row in rows}
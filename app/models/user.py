@@ -1,19 +1,25 @@
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import make_transient_to_detached
+
 from app import db, login_manager
+from app.utils.passwords import password_hasher
+from app.utils.user_cache import user_cache
 
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)
     anilist_username = db.Column(db.String(80), nullable=True)
     games = db.relationship("Game", backref="user", lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
 
     def get_id(self):
         return str(self.id)
@@ -34,4 +40,23 @@ class User(db.Model):
 # User loader for Flask-Login
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    values = user_cache.get(user_id)
+    if values is not None:
+        # attach a copy built from the cached columns without querying the database
+        # (password_hash is left out, it is loaded if ever accessed)
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    user = db.session.get(User, user_id)
+    if user is not None:
+        user_cache.put(
+            user_id,
+            {
+                "id": user.id,
+                "username": user.username,
+                "anilist_username": user.anilist_username,
+            },
+        )
+    return user
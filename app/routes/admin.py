@@ -0,0 +1,115 @@
+import os
+from functools import wraps
+
+from flask import Blueprint, current_app, jsonify, request, send_from_directory
+from flask_login import login_required, current_user
+
+from app.utils.admission import upstream_limiter
+from app.utils.metrics import metrics
+from app.utils.profiling import make_profile_token, profile_store
+from app.utils.sessions import CompactSessionInterface
+from app.utils.user_cache import user_cache
+from app.utils.warm_cache import warm_cache
+
+admin_bp = Blueprint("admin", __name__, url_prefix="/api/admin")
+
+
+def admin_required(view):
+    """Restricts a view to the usernames listed in the ADMIN_USERNAMES config."""
+
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if current_user.username not in current_app.config["ADMIN_USERNAMES"]:
+            return jsonify({"error": "Forbidden"}), 403
+        return view(*args, **kwargs)
+
+    return wrapped
+
+
+@admin_bp.route("/metrics", methods=["GET"])
+@admin_required
+def get_metrics():
+    """Upstream AniList call and cache counters for this process."""
+    return jsonify(metrics.snapshot()), 200
+
+
+@admin_bp.route("/admission", methods=["GET"])
+@admin_required
+def get_admission_stats():
+    """Queue depth and rejections of the cold AniList fetch limiter."""
+    return jsonify(upstream_limiter.stats()), 200
+
+
+@admin_bp.route("/sessions", methods=["GET"])
+@admin_required
+def get_session_stats():
+    """Size of the server-side session store."""
+    interface = current_app.session_interface
+    if not isinstance(interface, CompactSessionInterface):
+        return jsonify({"backend": current_app.config["SESSION_BACKEND"]}), 200
+
+    return jsonify(
+        {
+            "backend": current_app.config["SESSION_BACKEND"],
+            "rejected_oversize": interface.rejected,
+            **interface.store.stats(),
+        }
+    ), 200
+
+
+@admin_bp.route("/warm-cache", methods=["GET"])
+@admin_required
+def get_warm_cache_stats():
+    """Hits of the compiled game index and leaderboard cache of this process."""
+    return jsonify(warm_cache.stats()), 200
+
+
+@admin_bp.route("/user-cache", methods=["GET"])
+@admin_required
+def get_user_cache_stats():
+    """Hits of the cache of users loaded by Flask-Login in this process."""
+    return jsonify(user_cache.stats()), 200
+
+
+@admin_bp.route("/profiles", methods=["GET"])
+@admin_required
+def get_profiles():
+    """
+    Slowest profiled requests of all workers. `?limit=` caps the list (20) and
+    `?top=` adds the functions with the most cumulative time of each sample.
+    """
+    limit = request.args.get("limit", 20, type=int)
+    top = request.args.get("top", 0, type=int)
+
+    samples = profile_store.samples()[:limit]
+    if top > 0:
+        for sample in samples:
+            try:
+                sample["top"] = profile_store.top_functions(sample["file"], top)
+            except OSError:
+                # removed by another worker meanwhile
+                sample["top"] = []
+    return jsonify({"samples": samples}), 200
+
+
+@admin_bp.route("/profiles/<path:name>", methods=["GET"])
+@admin_required
+def download_profile(name):
+    """The pstats dump of a sample (e.g. for `python -m pstats` or snakeviz)."""
+    return send_from_directory(
+        os.path.abspath(current_app.config["PROFILE_DIR"]), name, as_attachment=True
+    )
+
+
+@admin_bp.route("/profiles/token", methods=["POST"])
+@admin_required
+def create_profile_token():
+    """A token for the X-Profile header, to profile requests of any client."""
+    return jsonify(
+        {
+            "token": make_profile_token(current_app, current_user.username),
+            "header": "X-Profile",
+            "expires_in": current_app.config["PROFILE_TOKEN_MAX_AGE"],
+        }
+    ), 200
@@ -1,7 +1,8 @@
 from flask import Blueprint, jsonify, request
-from flask_login import login_user, logout_user, login_required
+from flask_login import current_user, login_user, logout_user, login_required
 from app import db
 from app.models.user import User
+from app.utils.user_cache import user_cache
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api")
 
@@ -42,6 +43,11 @@ def login():
     if not user or not user.check_password(data["password"]):
         return jsonify({"error": "Invalid username or password"}), 401
 
+    # upgrade hashes made with an older PASSWORD_METHOD while the password is known
+    if user.password_needs_rehash():
+        user.set_password(data["password"])
+        db.session.commit()
+
     login_user(user)
 
     return jsonify({"message": "Login successful", "user_id": user.id}), 200
@@ -50,5 +56,6 @@ def login():
 @auth_bp.route("/logout", methods=["POST"])
 @login_required
 def logout():
+    user_cache.forget(current_user.id)
     logout_user()
     return jsonify({"message": "Logout successful"}), 200
@@ -1,19 +1,39 @@
 import json
+import logging
 import os
 import time
-import traceback
 from datetime import datetime
 
-from flask import Blueprint, jsonify, request, session, send_file
+from flask import Blueprint, current_app, g, jsonify, request, session, send_file
 from flask_login import login_required, current_user
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 
 from app import db
 from app.models.user import User
 from app.models.game import Game, Guess
-from app.utils.anilist import prepare_for_game_anilist, get_characters_from_anime
+from app.models.stats import (
+    CharacterStat,
+    UserStats,
+    character_guess_rates,
+    record_characters_seen,
+)
+from app.routes.images import proxied_image
+from app.utils.admission import UpstreamBusy
+from app.utils.anilist import (
+    AniListNotFound,
+    characters_version,
+    prepare_for_game_anilist,
+    get_characters_from_anime,
+)
+from app.utils.configs import games_path
+from app.utils.http import json_response, make_etag, not_modified
+from app.utils.warm_cache import warm_cache
 
 game_bp = Blueprint("game", __name__, url_prefix="/api")
 
+logger = logging.getLogger(__name__)
+
 
 @game_bp.route("/game/state", methods=["GET"])
 @login_required
@@ -64,14 +84,26 @@ def start_game():
     try:
         # Get character data for the selected anime
         anime_id = int(data["anime_id"])  # Ensure anime_id is an integer
-        print(f"Starting game for anime ID: {anime_id}, title: {data['anime_title']}")
+        logger.debug(
+            "Starting game for anime ID: %s, title: %s", anime_id, data["anime_title"]
+        )
 
+        min_guess_rate = current_app.config["DIFFICULTY_MIN_GUESS_RATE"]
+        guess_rates = (
+            character_guess_rates(anime_id, current_app.config["DIFFICULTY_MIN_GAMES"])
+            if min_guess_rate > 0
+            else None
+        )
         map_char_and_names, map_index_to_infos = prepare_for_game_anilist(
-            anime_id=anime_id, favourite_cut=5
+            anime_id=anime_id,
+            favourite_cut=5,
+            guess_rates=guess_rates,
+            min_guess_rate=min_guess_rate,
+            explore_rate=current_app.config["DIFFICULTY_EXPLORE_RATE"],
         )
 
         if not map_index_to_infos or len(map_index_to_infos) == 0:
-            print("No character data found for anime")
+            logger.info("No character data found for anime %s", anime_id)
             return jsonify({"error": "No character data found for this anime"}), 400
 
         # Create a new game
@@ -83,10 +115,14 @@ def start_game():
         )
 
         db.session.add(game)
+        UserStats.record_game_started(current_user.id)
         db.session.commit()
 
-        print(
-            f"Created game with ID: {game.id}, total characters: {game.total_characters}"
+        g.game_id = game.id
+        logger.info(
+            "Created game for anime %s with %d characters",
+            anime_id,
+            game.total_characters,
         )
 
         # Store game data in session
@@ -99,7 +135,6 @@ def start_game():
 
         # Ensure session is saved
         session.modified = True
-        print(f"Session set: game_id={session.get('game_id')}")
 
         return jsonify(
             {
@@ -109,17 +144,18 @@ def start_game():
                 "total_characters": game.total_characters,
             }
         ), 201
+    except UpstreamBusy:
+        raise
+    except AniListNotFound:
+        return jsonify({"error": "Anime not found on AniList"}), 404
     except Exception as e:
-        print(f"Error starting game: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error starting game: %s", e)
         return jsonify({"error": f"Failed to start game: {str(e)}"}), 500
 
 
 @game_bp.route("/game/guess", methods=["POST"])
 @login_required
 def make_guess():
-    print(f"Current session: game_id={session.get('game_id')}")
-
     if "game_id" not in session:
         return jsonify({"error": "No active game"}), 400
 
@@ -129,6 +165,7 @@ def make_guess():
         return jsonify({"error": "Guess is required"}), 400
 
     game_id = session["game_id"]
+    g.game_id = game_id
     game = Game.query.get(game_id)
 
     if not game or game.user_id != current_user.id:
@@ -142,9 +179,11 @@ def make_guess():
     map_index_to_infos = session.get("map_index_to_infos", {})
     guessed_indexes = session.get("guessed_indexes", [])
 
-    print(f"Processing guess: '{user_input}' for game {game_id}")
-    print(
-        f"Session data: characters={len(map_char_and_names)}, indices={len(guessed_indexes)}"
+    logger.debug(
+        "Processing guess '%s' (names left=%d, guessed=%d)",
+        user_input,
+        len(map_char_and_names),
+        len(guessed_indexes),
     )
 
     # Process the guess
@@ -188,11 +227,14 @@ def make_guess():
     )
 
     db.session.add(guess)
+    UserStats.record_guess(current_user.id, is_correct)
 
     # Check if game is completed
     if game.correct_guesses >= game.total_characters:
         game.completed = True
         game.end_time = datetime.utcnow()
+        UserStats.record_game_completed(game)
+        record_characters_seen(game.anime_id, map_index_to_infos, guessed_indexes)
 
         # Clear game session data
         session.pop("game_id", None)
@@ -228,6 +270,7 @@ def end_game():
         return jsonify({"error": "No active game"}), 400
 
     game_id = session["game_id"]
+    g.game_id = game_id
     game = Game.query.get(game_id)
 
     if not game or game.user_id != current_user.id:
@@ -238,6 +281,12 @@ def end_game():
 
     game.completed = True
     game.end_time = datetime.utcnow()
+    UserStats.record_game_completed(game)
+    record_characters_seen(
+        game.anime_id,
+        session.get("map_index_to_infos", {}),
+        session.get("guessed_indexes", []),
+    )
 
     # Clear game session data
     session.pop("game_id", None)
@@ -253,12 +302,29 @@ def end_game():
 @game_bp.route("/games", methods=["GET"])
 @login_required
 def get_games():
+    # every guess bumps total_guesses and every finished game gets an end_time
+    version = (
+        db.session.query(
+            func.count(Game.id),
+            func.max(Game.id),
+            func.sum(Game.total_guesses),
+            func.count(Game.end_time),
+        )
+        .filter(Game.user_id == current_user.id)
+        .one()
+    )
+    etag = make_etag("games", current_user.id, *version)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
     games = (
         Game.query.filter_by(user_id=current_user.id)
+        .options(selectinload(Game.guesses), selectinload(Game.archive))
         .order_by(Game.start_time.desc())
         .all()
     )
-    return jsonify({"games": [game.to_dict() for game in games]}), 200
+    return json_response({"games": [game.to_dict() for game in games]}, etag=etag)
 
 
 @game_bp.route("/game/<int:game_id>", methods=["GET"])
@@ -285,7 +351,7 @@ def export_game(game_id):
 
     # Save to file
     filename = f"game_{game_id}_{int(time.time())}.json"
-    filepath = os.path.join("./data/games/", filename)
+    filepath = os.path.join(games_path, filename)
 
     with open(filepath, "w") as f:
         json.dump(export_data, f, indent=2)
@@ -293,8 +359,20 @@ def export_game(game_id):
     return send_file(filepath, as_attachment=True)
 
 
-@game_bp.route("/leaderboard", methods=["GET"])
-def get_leaderboard():
+def top_games_leaderboard() -> list[dict]:
+    """Returns the 10 best completed games, cached until another game is completed."""
+    # scores are final once a game is completed
+    completed_count, last_end = (
+        db.session.query(func.count(Game.id), func.max(Game.end_time))
+        .filter(Game.completed.is_(True))
+        .one()
+    )
+    version = f"{completed_count}@{last_end.isoformat() if last_end else ''}"
+    # a single entry, whose version is checked here rather than put in the key
+    cached = warm_cache.get("leaderboard")
+    if cached is not None and cached["version"] == version:
+        return cached["leaderboard"]
+
     # Get top 10 games by score
     top_games = (
         Game.query.filter_by(completed=True).order_by(Game.score.desc()).limit(10).all()
@@ -314,7 +392,30 @@ def get_leaderboard():
             }
         )
 
-    return jsonify({"leaderboard": leaderboard}), 200
+    warm_cache.put("leaderboard", {"version": version, "leaderboard": leaderboard})
+    return leaderboard
+
+
+@game_bp.route("/leaderboard", methods=["GET"])
+def get_leaderboard():
+    return jsonify({"leaderboard": top_games_leaderboard()}), 200
+
+
+@game_bp.route("/anime/<int:anime_id>/characters/stats", methods=["GET"])
+@login_required
+def get_character_stats(anime_id):
+    """How often each character of an anime is found, hardest first."""
+    rows = (
+        CharacterStat.query.filter_by(anime_id=anime_id)
+        .order_by(
+            (CharacterStat.times_guessed * 1.0 / CharacterStat.games_seen),
+            CharacterStat.games_seen.desc(),
+        )
+        .all()
+    )
+    return jsonify(
+        {"anime_id": anime_id, "characters": [row.to_dict() for row in rows]}
+    ), 200
 
 
 @game_bp.route("/game/characters/<int:game_id>", methods=["GET"])
@@ -326,9 +427,28 @@ def get_game_characters(game_id):
     if not game or game.user_id != current_user.id:
         return jsonify({"error": "Game not found"}), 404
 
+    def characters_etag():
+        version = characters_version(game.anime_id)
+        if version is None:
+            return None
+        return make_etag(
+            "characters",
+            game.id,
+            game.total_guesses,
+            game.correct_guesses,
+            game.completed,
+            version,
+            current_app.config["IMAGE_PROXY"],
+        )
+
+    etag = characters_etag()
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
     # Get all guesses for this game
-    guesses = Guess.query.filter_by(game_id=game_id).all()
-    correct_guesses = [g.character_name for g in guesses if int(g.is_correct)]
+    guesses = game.guess_history()
+    correct_guesses = [g["character_name"] for g in guesses if g["is_correct"]]
 
     # Get all characters for this anime
     try:
@@ -351,14 +471,14 @@ def get_game_characters(game_id):
                     "id": char["id"],
                     "name": display_name,
                     "native_name": names.get("native", ""),
-                    "image": char["image"],
+                    "image": proxied_image(char["image"]),
                     "role": char["role"],
                     "favourites": char["favourites"],
                     "was_guessed": was_guessed,
                 }
             )
 
-        return jsonify(
+        return json_response(
             {
                 "game_id": game_id,
                 "anime_title": game.anime_title,
@@ -368,10 +488,14 @@ def get_game_characters(game_id):
                 "total_guesses": game.total_guesses,
                 "score": game.score,
                 "completed": game.completed,
-            }
-        ), 200
+            },
+            etag=etag or characters_etag(),
+        )
 
+    except UpstreamBusy:
+        raise
+    except AniListNotFound:
+        return jsonify({"error": "Anime not found on AniList"}), 404
     except Exception as e:
-        print(f"Error retrieving characters: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error retrieving characters for game %s: %s", game_id, e)
         return jsonify({"error": f"Failed to retrieve characters: {str(e)}"}), 500
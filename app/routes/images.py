@@ -0,0 +1,47 @@
+import logging
+from typing import Optional
+
+import requests
+from flask import Blueprint, Response, current_app, jsonify, request, url_for
+
+from app.utils.images import ImageNotAllowed, guess_mimetype, thumbnail_cache
+
+logger = logging.getLogger(__name__)
+
+images_bp = Blueprint("images", __name__, url_prefix="/api")
+
+# thumbnails never change for a given URL
+THUMBNAIL_MAX_AGE = 365 * 24 * 3600
+
+
+def proxied_image(url: Optional[str]) -> Optional[str]:
+    """Returns the thumbnail proxy URL of an image when the proxy is enabled."""
+    if not url or not current_app.config["IMAGE_PROXY"]:
+        return url
+    return url_for("images.get_thumbnail", url=url)
+
+
+@images_bp.route("/images/thumbnail", methods=["GET"])
+def get_thumbnail():
+    """Serve a downscaled copy of an AniList image, fetched once and kept on disk."""
+    if not current_app.config["IMAGE_PROXY"]:
+        return jsonify({"error": "Image proxy is disabled"}), 404
+
+    url = request.args.get("url")
+    if not url:
+        return jsonify({"error": "Image url is required"}), 400
+
+    try:
+        key, data = thumbnail_cache.get(url)
+    except ImageNotAllowed as e:
+        return jsonify({"error": str(e)}), 400
+    except requests.RequestException as e:
+        logger.warning("Failed to fetch image %s: %s", url, e)
+        return jsonify({"error": "Failed to fetch image"}), 502
+
+    response = Response(data, mimetype=guess_mimetype(data))
+    response.set_etag(key)
+    response.cache_control.public = True
+    response.cache_control.max_age = THUMBNAIL_MAX_AGE
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
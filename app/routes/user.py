@@ -1,11 +1,24 @@
-from flask import Blueprint, jsonify, request
+import logging
+
+from flask import Blueprint, current_app, jsonify, request
 from flask_login import login_required, current_user
 
 from app import db
-from app.utils.anilist import get_animes_from_user
+from app.models.stats import UserStats
+from app.utils.admission import UpstreamBusy
+from app.routes.images import proxied_image
+from app.utils.anilist import (
+    AniListNotFound,
+    get_animes_from_user,
+    watchlist_version,
+)
+from app.utils.http import json_response, make_etag, not_modified
+from app.utils.user_cache import user_cache
 
 user_bp = Blueprint("user", __name__, url_prefix="/api")
 
+logger = logging.getLogger(__name__)
+
 
 @user_bp.route("/user/profile", methods=["GET"])
 @login_required
@@ -29,6 +42,7 @@ def update_anilist_username():
 
     current_user.anilist_username = data["anilist_username"]
     db.session.commit()
+    user_cache.forget(current_user.id)
 
     return jsonify({"message": "Anilist username updated successfully"}), 200
 
@@ -39,8 +53,22 @@ def get_animes():
     if not current_user.anilist_username:
         return jsonify({"error": "Anilist username not set"}), 400
 
+    username = current_user.anilist_username
+
+    def animes_etag():
+        version = watchlist_version(username)
+        if version is None:
+            return None
+        return make_etag("animes", username, version, current_app.config["IMAGE_PROXY"])
+
+    # the client's copy is still current: skip reading and serialising the list
+    etag = animes_etag()
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
     try:
-        user_list = get_animes_from_user(username=current_user.anilist_username)
+        user_list = get_animes_from_user(username=username)
 
         animes = []
         for status in user_list["animeList"]["allStatus"]:
@@ -53,12 +81,29 @@ def get_animes():
                         "status": status,
                         "episodes": anime["media"]["episodes"],
                         "score": anime["score"],
-                        "cover_image": anime["media"]["coverImage"]["large"],
+                        "cover_image": proxied_image(
+                            anime["media"]["coverImage"]["large"]
+                        ),
                         "banner_image": anime["media"]["bannerImage"],
                         "completed_at": anime["completedAt"],
                     }
                 )
 
-        return jsonify({"animes": animes}), 200
+        return json_response({"animes": animes}, etag=etag or animes_etag())
+    except UpstreamBusy:
+        raise
+    except AniListNotFound:
+        return jsonify({"error": "AniList user not found"}), 404
     except Exception as e:
+        logger.exception("Error retrieving watchlist: %s", e)
         return jsonify({"error": str(e)}), 500
+
+
+@user_bp.route("/user/stats", methods=["GET"])
+@login_required
+def get_user_stats():
+    # created from the game history on first use
+    stats = UserStats.for_user(current_user.id)
+    db.session.commit()
+
+    return jsonify({"stats": stats.to_dict()}), 200
@@ -0,0 +1,118 @@
+import threading
+from contextlib import contextmanager
+from time import monotonic
+from typing import Iterator
+
+
+class UpstreamBusy(Exception):
+    """Raised when a request cannot be admitted to contact AniList right now."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Too many requests waiting for AniList")
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    Bounds how many requests may wait on AniList at once.
+
+    Up to `max_concurrent` callers run; up to `max_queue` more wait at most
+    `queue_timeout` seconds for a free slot; everyone else is rejected right away
+    with UpstreamBusy, so that worker threads are not all tied up by a slow upstream.
+
+    Args:
+        max_concurrent (int): Callers allowed to contact AniList at the same time.
+        max_queue (int): Callers allowed to wait for a slot.
+        queue_timeout (float): Longest wait for a slot, in seconds.
+        retry_after (int): Seconds suggested to rejected clients.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        max_queue: int = 8,
+        queue_timeout: float = 2.0,
+        retry_after: int = 5,
+    ) -> None:
+        self._cond = threading.Condition()
+        self.configure(max_concurrent, max_queue, queue_timeout, retry_after)
+        self._in_flight = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    def configure(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        retry_after: int,
+    ) -> None:
+        with self._cond:
+            self.max_concurrent = max_concurrent
+            self.max_queue = max_queue
+            self.queue_timeout = queue_timeout
+            self.retry_after = retry_after
+            self._cond.notify_all()
+
+    def acquire(self) -> None:
+        """
+        Takes a slot, waiting in the queue if needed.
+
+        Raises:
+            UpstreamBusy: If the queue is full or no slot freed up in time.
+        """
+        with self._cond:
+            if self._in_flight >= self.max_concurrent:
+                if self._waiting >= self.max_queue:
+                    self._rejected += 1
+                    raise UpstreamBusy(self.retry_after)
+
+                self._waiting += 1
+                try:
+                    deadline = monotonic() + self.queue_timeout
+                    while self._in_flight >= self.max_concurrent:
+                        remaining = deadline - monotonic()
+                        if remaining <= 0:
+                            self._rejected += 1
+                            self._timed_out += 1
+                            raise UpstreamBusy(self.retry_after)
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            self._in_flight += 1
+            self._admitted += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Holds a slot for the duration of the `with` block."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict[str, int | float]:
+        """Returns the current queue depth and the admission counters."""
+        with self._cond:
+            return {
+                "in_flight": self._in_flight,
+                "queued": self._waiting,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+            }
+
+
+# process-wide limiter for cold AniList fetches
+upstream_limiter = AdmissionLimiter()
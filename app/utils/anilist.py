@@ -1,23 +1,74 @@
-import json
+import logging
+import random
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from time import sleep
-from typing import Any, Callable, Optional
+from time import perf_counter, sleep, time
+from typing import Any, Callable, Iterator, Optional
 
 import requests
 
-from app.utils.configs import characters_path, users_path, status_list
+from app.utils.admission import UpstreamBusy, upstream_limiter
+from app.utils.configs import (
+    aliases_path,
+    anilist_url,
+    cache_ttl,
+    characters_path,
+    status_list,
+    users_path,
+    watchlist_full_refresh,
+)
+from app.utils.metrics import metrics
+from app.utils.negative_cache import NegativeEntry, negative_cache
+from app.utils.warm_cache import warm_cache
 from app.utils.queries import (
     query_animes_from_user,
     query_characters_from_anime,
+    query_updated_entries_from_user,
     query_user_info,
 )
 from app.utils.utils import (
+    calculate_freshness,
     ensure_dir_exists,
     read_from_cache,
+    read_json,
     today_date_string,
+    touch,
+    write_cache,
 )
 
-URL = "https://graphql.anilist.co"
+URL = anilist_url
+
+logger = logging.getLogger(__name__)
+
+# set by use_async_client(); None means the blocking requests client is used
+_async_client = None
+
+# lowercased AniList username -> user id, mirrored in aliases_path
+_aliases: dict[str, int] = {}
+_aliases_lock = threading.Lock()
+
+
+class AniListClientError(ValueError):
+    """AniList rejected a request (4xx); retrying it would not help."""
+
+
+class AniListNotFound(AniListClientError):
+    """The requested user or media does not exist on AniList."""
+
+
+def raise_for_client_error(status_code: int, reason: str) -> None:
+    """
+    Raises for 4xx responses, except 429 (rate limited) which is worth retrying.
+
+    Args:
+        status_code (int): The HTTP status code of the response.
+        reason (str): The HTTP reason phrase of the response.
+    """
+    if status_code == 404:
+        raise AniListNotFound(f"Received '{reason}' as a response.")
+    if 400 <= status_code < 500 and status_code != 429:
+        raise AniListClientError(f"Received '{reason}' as a response.")
 
 
 def return_json(res: requests.Response) -> dict[str, Any]:
@@ -32,44 +83,66 @@ def get_data(
     timeout: int = 15,
     wait_time: int = 5,
     process_fn: Optional[Callable[[requests.Response], Any]] = None,
+    query_name: str = "unknown",
 ) -> requests.Response | Any:
     attempts = 0
     completed = False
     wait = False
 
     for attempts in range(max_retries):
+        if attempts:
+            metrics.record_retry(query_name)
         if wait:
             sleep(wait_time)
         try:
+            started = perf_counter()
             res = requests.post(
-                URL,
+                url,
                 json={"query": query, "variables": variables},
                 timeout=timeout,
             )
+            metrics.record_request(
+                query_name, perf_counter() - started, len(res.content), res.ok
+            )
             completed = res.ok
             if completed:
                 break
 
-            if 400 <= res.status_code < 500:
-                raise ValueError(f"Received '{res.reason}' as a response.")
+            raise_for_client_error(res.status_code, res.reason)
 
             # lets try again but now waiting a little (useful when the server may be overloaded)
             wait = True
             attempts += 1
             wait_time *= attempts
-            print(
-                f"Received '{res.reason}' for link {url}. Trying again after {wait_time}s."
+            logger.warning(
+                "Received '%s' for link %s. Trying again after %ss.",
+                res.reason,
+                url,
+                wait_time,
             )
 
+        except AniListClientError:
+            metrics.record_failure(query_name)
+            raise
+
         except TimeoutError:
-            print(f"Timeout during url {url} request. (attempt: {attempts + 1})")
+            logger.warning(
+                "Timeout during url %s request. (attempt: %d)", url, attempts + 1
+            )
 
         except Exception as e:
-            print(str(e))
-            print(f"Failed to request data from link {url}. (attempt: {attempts + 1})")
+            logger.warning(
+                "Failed to request data from link %s. (attempt: %d): %s",
+                url,
+                attempts + 1,
+                e,
+            )
 
     if not completed:
-        print(f"Failed to get response from url {url} after {max_retries} attempts.")
+        metrics.record_failure(query_name)
+        logger.error(
+            "Failed to get response from url %s after %d attempts.", url, max_retries
+        )
         raise TimeoutError
 
     elif process_fn is not None:
@@ -78,35 +151,94 @@ def get_data(
     return res
 
 
-def get_infos_from_user(username: str) -> dict[str, str]:
-    variables = {"userName": username}
-    res = get_data(URL, query_user_info, variables, process_fn=return_json)
+def use_async_client(max_concurrency: int = 8) -> None:
+    """
+    Routes every AniList fetch through the asyncio client (requires aiohttp).
 
-    return res["data"]
+    Page fetches then run concurrently on one background event loop shared by all
+    request threads, instead of each thread blocking on its own crawl.
 
+    Args:
+        max_concurrency (int): Maximum number of requests in flight at once.
+    """
+    global _async_client
 
-def get_animes_from_user(username: str, chunk_size: int = 200) -> dict[str, str]:
-    # from here we can get some metadata such as user_id, avatar, options and statistics
-    user_info = get_data(
-        URL, query_user_info, {"userName": username}, process_fn=return_json
-    )
-    user_data = {
-        "user": user_info["data"]["User"],
-        "animeList": {
-            "allStatus": status_list,
-        },
-        "last_updated": today_date_string(),
+    from app.utils.anilist_async import AniListFacade
+
+    if _async_client is None:
+        _async_client = AniListFacade(URL, max_concurrency=max_concurrency)
+
+
+def parse_character(edge: dict[str, Any]) -> dict[str, Any]:
+    """
+    Flattens a character edge from `query_characters_from_anime` into a cache entry.
+
+    Args:
+        edge (dict[str, Any]): An item of `Media.characters.edges`.
+
+    Returns:
+        dict[str, Any]: The id, names, image, gender, favourites and role of the character.
+    """
+    info = edge["node"]
+    return {
+        "id": info["id"],
+        "name": info["name"],
+        "image": info["image"]["large"],
+        "gender": info["gender"],
+        "favourites": info["favourites"],
+        "role": edge["role"],
     }
 
-    user_id = user_data["user"]["id"]
-    filepath = Path(f"{users_path}{user_id}.json").resolve()
 
-    # reading from "cache"
-    if filepath.exists():
-        cache_result = read_from_cache(filepath=filepath)
-        if cache_result:
-            # still fresh enough
-            return cache_result
+def merge_watchlist(
+    entries_by_status: dict[str, list[dict[str, Any]]],
+) -> dict[str, list[dict[str, Any]]]:
+    """
+    Removes entries repeated across statuses, keeping the first one in `status_list` order.
+
+    Args:
+        entries_by_status (dict[str, list[dict[str, Any]]]): Raw entries fetched per status.
+
+    Returns:
+        dict[str, list[dict[str, Any]]]: The entries per status, only for non-empty statuses.
+    """
+    already_processed = set()
+    anime_list = {}
+
+    for status in status_list:
+        for entry in entries_by_status.get(status, []):
+            current_id = entry["media"]["id"]
+            if current_id in already_processed:
+                logger.debug("Skipping duplicate entry %s", current_id)
+                continue
+
+            anime_list.setdefault(status, []).append(entry)
+            already_processed.add(current_id)
+
+    return anime_list
+
+
+def fetch_user_info(username: str) -> dict[str, Any]:
+    """Fetches the AniList profile (`User`) of a username."""
+    if _async_client is not None:
+        return _async_client.user_info(username)
+
+    res = get_data(
+        URL,
+        query_user_info,
+        {"userName": username},
+        process_fn=return_json,
+        query_name="user_info",
+    )
+    return res["data"]["User"]
+
+
+def fetch_watchlist(
+    username: str, chunk_size: int = 200
+) -> dict[str, list[dict[str, Any]]]:
+    """Fetches every list entry of a user, grouped by status (see `merge_watchlist`)."""
+    if _async_client is not None:
+        return _async_client.watchlist(username, chunk_size)
 
     variables = {
         "userName": username,
@@ -114,7 +246,8 @@ def get_animes_from_user(username: str, chunk_size: int = 200) -> dict[str, str]
         "perChunk": chunk_size,
         "status": "",
     }
-    already_processed = set()
+    entries_by_status = {}
+    pages = 0
 
     for status in status_list:
         variables["chunk"] = 1
@@ -122,90 +255,429 @@ def get_animes_from_user(username: str, chunk_size: int = 200) -> dict[str, str]
 
         while True:
             res = get_data(
-                URL, query_animes_from_user, variables, process_fn=return_json
+                URL,
+                query_animes_from_user,
+                variables,
+                process_fn=return_json,
+                query_name="animes_from_user",
             )
+            pages += 1
             data = res["data"]["MediaListCollection"]
 
             for item in data["lists"]:
-                # remove duplicates
-                for entry in item["entries"]:
-                    current_id = entry["media"]["id"]
-                    if current_id in already_processed:
-                        print(entry)
-                        continue
-
-                    if status in user_data["animeList"]:
-                        user_data["animeList"][status].append(entry)
-                    else:
-                        user_data["animeList"][status] = [entry]
-
-                    already_processed.add(current_id)
+                entries_by_status.setdefault(status, []).extend(item["entries"])
 
             if not data["hasNextChunk"]:
                 break
 
             variables["chunk"] += 1
 
-    ensure_dir_exists(users_path)
-    # caching data
-    print("Caching info...")
-    with open(file=filepath, mode="w", encoding="utf-8") as f:
-        json.dump(user_data, f, indent=4)
+    metrics.record_crawl("animes_from_user", pages)
+    return merge_watchlist(entries_by_status)
 
-    return user_data
 
+def fetch_updated_entries(
+    user_id: int, since: int, per_page: int = 50
+) -> list[dict[str, Any]]:
+    """
+    Fetches the list entries of a user updated at or after a point in time.
+
+    Entries are read newest first and paging stops at the first one older than
+    `since`, so the cost follows how much the user changed, not the list size.
+
+    Args:
+        user_id (int): The AniList user id.
+        since (int): Unix time of the last entry update already known.
+        per_page (int): Entries per page (at most 50 on AniList).
+
+    Returns:
+        list[dict[str, Any]]: The updated entries, newest first.
+    """
+    if _async_client is not None:
+        return _async_client.updated_entries(user_id, since, per_page)
+
+    variables = {"userId": user_id, "page": 1, "perPage": per_page}
+    updated = []
+
+    while True:
+        res = get_data(
+            URL,
+            query_updated_entries_from_user,
+            variables,
+            process_fn=return_json,
+            query_name="updated_entries",
+        )
+        page = res["data"]["Page"]
+        entries = page["mediaList"]
+        # entries updated in the same second as the last sync are merged again
+        updated.extend(entry for entry in entries if entry["updatedAt"] >= since)
+
+        if (
+            not page["pageInfo"]["hasNextPage"]
+            or not entries
+            or entries[-1]["updatedAt"] < since
+        ):
+            break
+
+        variables["page"] += 1
+
+    metrics.record_crawl("updated_entries", variables["page"])
+    return updated
+
+
+def apply_watchlist_updates(
+    anime_list: dict[str, Any], updated: list[dict[str, Any]]
+) -> dict[str, Any]:
+    """
+    Merges updated entries into a cached watchlist.
+
+    An updated entry replaces the cached one of the same anime, moving it to its new
+    status; anime moved to a status that is not tracked (e.g. PLANNING) are dropped.
+
+    Args:
+        anime_list (dict[str, Any]): The cached `animeList` (entries per status).
+        updated (list[dict[str, Any]]): Entries from `fetch_updated_entries`.
+
+    Returns:
+        dict[str, Any]: The merged `animeList`, each status still sorted by score.
+    """
+    updated_by_id = {}
+    # oldest first, so the newest update of an anime wins
+    for entry in reversed(updated):
+        updated_by_id[entry["media"]["id"]] = entry
+
+    merged = {"allStatus": status_list}
+    for status in status_list:
+        kept = [
+            entry
+            for entry in anime_list.get(status, [])
+            if entry["media"]["id"] not in updated_by_id
+        ]
+        kept.extend(e for e in updated_by_id.values() if e["status"] == status)
+        if kept:
+            # same order as query_animes_from_user (SCORE_DESC)
+            merged[status] = sorted(kept, key=lambda e: e["score"], reverse=True)
+
+    return merged
+
+
+def latest_update(anime_list: dict[str, Any]) -> int:
+    """Returns the most recent `updatedAt` of a watchlist (0 if unknown)."""
+    return max(
+        (
+            entry.get("updatedAt") or 0
+            for status in status_list
+            for entry in anime_list.get(status, [])
+        ),
+        default=0,
+    )
+
+
+def fetch_characters(anime_id: int) -> list[dict[str, Any]]:
+    """Fetches the whole cast of an anime, as entries built by `parse_character`."""
+    if _async_client is not None:
+        return _async_client.characters(anime_id)
 
-def get_characters_from_anime(anime_id: int = 12189) -> dict[str, str]:
     variables = {"animeId": anime_id, "page": 1}
     final_data = []
 
-    # reading from "cache" (possibly early return)
-    filepath = Path(f"{characters_path}{anime_id}.json").resolve()
-    if filepath.exists():
-        cache_result = read_from_cache(filepath=filepath)
-        if cache_result:
-            # still fresh enough
-            return cache_result
-
     while True:
         res = get_data(
-            URL, query_characters_from_anime, variables, process_fn=return_json
+            URL,
+            query_characters_from_anime,
+            variables,
+            process_fn=return_json,
+            query_name="characters_from_anime",
         )
-        data = res["data"]["Media"]["characters"]["edges"]
-
-        for item in data:
-            info = item["node"]
-            entry = {
-                "id": info["id"],
-                "name": info["name"],
-                "image": info["image"]["large"],
-                "gender": info["gender"],
-                "favourites": info["favourites"],
-                "role": item["role"],
-            }
-            final_data.append(entry)
+        characters = res["data"]["Media"]["characters"]
+        final_data.extend(parse_character(edge) for edge in characters["edges"])
 
-        if not res["data"]["Media"]["characters"]["pageInfo"]["hasNextPage"]:
+        if not characters["pageInfo"]["hasNextPage"]:
             break
 
         variables["page"] += 1
 
-    ensure_dir_exists(characters_path)
+    metrics.record_crawl("characters_from_anime", variables["page"])
+    return final_data
+
+
+def get_infos_from_user(username: str) -> dict[str, str]:
+    return {"User": fetch_user_info(username)}
+
+
+def lookup_user_id(username: str) -> Optional[int]:
+    """
+    Returns the AniList id last seen for a username, if any.
+
+    Args:
+        username (str): The AniList username (case insensitive).
+
+    Returns:
+        Optional[int]: The user id, or None if the username was never looked up.
+    """
+    key = username.lower()
+    with _aliases_lock:
+        if key not in _aliases and Path(aliases_path).exists():
+            _aliases.update(read_json(aliases_path))
+        return _aliases.get(key)
+
+
+def remember_user_id(username: str, user_id: int) -> None:
+    """Stores the AniList id of a username so later lookups skip `query_user_info`."""
+    key = username.lower()
+    with _aliases_lock:
+        if _aliases.get(key) == user_id:
+            return
+
+        _aliases[key] = user_id
+        # merge with the aliases written by other processes
+        if Path(aliases_path).exists():
+            _aliases.update({**read_json(aliases_path), key: user_id})
+        ensure_dir_exists(users_path)
+        write_cache(aliases_path, _aliases)
+
+
+def _raise_for_negative(entry: NegativeEntry, description: str) -> None:
+    if entry.reason == "missing":
+        raise AniListNotFound(f"{description} not found on AniList.")
+    # still backing off from repeated failures
+    raise UpstreamBusy(entry.retry_after)
+
+
+@contextmanager
+def _remember_failures(kind: str, key: str | int) -> Iterator[None]:
+    """Records 404s and exhausted retries of the wrapped fetch in the negative cache."""
+    try:
+        yield
+    except AniListNotFound:
+        negative_cache.add(kind, key, "missing")
+        raise
+    except TimeoutError:
+        negative_cache.add(kind, key, "failing")
+        raise
+
+
+def _read_user_cache(user_id: int) -> tuple[dict[str, Any], bool]:
+    # stale data is returned too, it is the base of an incremental refresh
+    filepath = Path(f"{users_path}{user_id}.json").resolve()
+
+    cache_result = read_json(filepath) if filepath.exists() else {}
+    if not cache_result:
+        metrics.record_cache("users", "miss")
+        return {}, False
+
+    touch(filepath)
+
+    if calculate_freshness(cache_result["last_updated"]) < cache_ttl:
+        # still fresh enough
+        metrics.record_cache("users", "hit")
+        return cache_result, True
+
+    metrics.record_cache("users", "stale")
+    return cache_result, False
+
+
+def _can_refresh_incrementally(cache_result: dict[str, Any]) -> bool:
+    # caches written before incremental refreshes lack these fields
+    if not cache_result.get("synced_at") or "last_full_sync" not in cache_result:
+        return False
+    return calculate_freshness(cache_result["last_full_sync"]) < watchlist_full_refresh
+
+
+def _cache_version(filepath: Path) -> Optional[str]:
+    try:
+        stat = filepath.stat()
+    except FileNotFoundError:
+        return None
+
+    # a day of margin, freshness is only checked with day granularity
+    if time() - stat.st_mtime >= (cache_ttl - 1) * 86400:
+        return None
+    # what is built from the file (warm cache entries, ETags) is served without
+    # reading it, so this counts as a use for the cache pruner
+    touch(filepath)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def watchlist_version(username: str) -> Optional[str]:
+    """
+    Identifies the cached watchlist of a username without reading it.
+
+    Args:
+        username (str): The AniList username.
+
+    Returns:
+        Optional[str]: A value that changes whenever the cache is rewritten, or None
+            if the next `get_animes_from_user` call may have to contact AniList.
+    """
+    user_id = lookup_user_id(username)
+    if user_id is None:
+        return None
+    return _cache_version(Path(f"{users_path}{user_id}.json"))
+
+
+def characters_version(anime_id: int) -> Optional[str]:
+    """Like `watchlist_version`, for the cached cast of an anime."""
+    return _cache_version(Path(f"{characters_path}{anime_id}.json"))
+
+
+def get_animes_from_user(username: str, chunk_size: int = 200) -> dict[str, str]:
+    # usernames seen before are served from "cache" without contacting AniList
+    known_id = lookup_user_id(username)
+    cache_result = {}
+    if known_id is not None:
+        cache_result, fresh = _read_user_cache(known_id)
+        if fresh:
+            return cache_result
+
+    negative_key = username.lower()
+    entry = negative_cache.lookup("user", negative_key)
+    if entry is not None:
+        metrics.record_cache("users", "negative")
+        _raise_for_negative(entry, f"User '{username}'")
+
+    with upstream_limiter.slot(), _remember_failures("user", negative_key):
+        # from here we can get some metadata such as user_id, avatar, options and statistics
+        user_data = {
+            "user": fetch_user_info(username),
+            "animeList": {
+                "allStatus": status_list,
+            },
+            "last_updated": today_date_string(),
+            "last_full_sync": today_date_string(),
+        }
+
+        user_id = user_data["user"]["id"]
+        remember_user_id(username, user_id)
+
+        # reading from "cache"
+        if user_id != known_id:
+            cache_result, fresh = _read_user_cache(user_id)
+            if fresh:
+                return cache_result
+
+        if _can_refresh_incrementally(cache_result):
+            logger.debug("Refreshing watchlist of user %s incrementally", user_id)
+            updated = fetch_updated_entries(user_id, cache_result["synced_at"])
+            user_data["animeList"] = apply_watchlist_updates(
+                cache_result["animeList"], updated
+            )
+            user_data["last_full_sync"] = cache_result["last_full_sync"]
+            # updates may have moved entries out of the tracked statuses
+            user_data["synced_at"] = max(
+                [cache_result["synced_at"]] + [e["updatedAt"] for e in updated]
+            )
+        else:
+            user_data["animeList"].update(fetch_watchlist(username, chunk_size))
+            user_data["synced_at"] = latest_update(user_data["animeList"])
+
+    negative_cache.clear("user", negative_key)
+    filepath = Path(f"{users_path}{user_id}.json").resolve()
+    ensure_dir_exists(users_path)
+    # caching data
+    logger.debug("Caching watchlist of user %s", user_id)
+    write_cache(filepath, user_data)
+
+    return user_data
+
+
+def get_characters_from_anime(anime_id: int = 12189) -> dict[str, str]:
+    # reading from "cache" (possibly early return)
+    filepath = Path(f"{characters_path}{anime_id}.json").resolve()
+    if filepath.exists():
+        cache_result = read_from_cache(filepath=filepath)
+        if cache_result:
+            # still fresh enough
+            metrics.record_cache("characters", "hit")
+            return cache_result
+        metrics.record_cache("characters", "stale")
+    else:
+        metrics.record_cache("characters", "miss")
+
+    entry = negative_cache.lookup("characters", anime_id)
+    if entry is not None:
+        metrics.record_cache("characters", "negative")
+        if entry.reason == "empty":
+            return {"data": [], "last_updated": today_date_string()}
+        _raise_for_negative(entry, f"Anime {anime_id}")
+
+    with upstream_limiter.slot(), _remember_failures("characters", anime_id):
+        # another request may have fetched the same cast while this one was queued
+        if filepath.exists():
+            cache_result = read_from_cache(filepath=filepath)
+            if cache_result:
+                return cache_result
+
+        final_data = fetch_characters(anime_id)
 
     character_data = {
         "data": final_data,
         "last_updated": today_date_string(),
     }
 
+    if not final_data:
+        # the cast may be filled in later, so only remember it for a short while
+        negative_cache.add("characters", anime_id, "empty")
+        return character_data
+
+    negative_cache.clear("characters", anime_id)
+    ensure_dir_exists(characters_path)
+
     # caching data
-    with open(file=filepath, mode="w", encoding="utf-8") as f:
-        json.dump(character_data, f, indent=4)
+    write_cache(filepath, character_data)
 
     return character_data
 
 
+def apply_difficulty_cut(
+    map_char_and_names: dict[str, int],
+    map_index_to_infos: dict[int, dict],
+    guess_rates: dict[int, float],
+    min_guess_rate: float,
+    explore_rate: float = 0.0,
+) -> tuple[dict[str, int], dict[int, dict]]:
+    """
+    Removes from a game index the characters that players rarely find.
+
+    Each removed character is drawn back in with probability `explore_rate`, so
+    that it keeps being seen: a character left out of every game would never get
+    the games that could raise its guess rate back over the cut.
+
+    Args:
+        map_char_and_names (dict[str, int]): Names to character indices.
+        map_index_to_infos (dict[int, dict]): Character indices to infos.
+        guess_rates (dict[int, float]): Share of games in which each character
+            (by AniList id) was guessed. Characters without a rate are kept.
+        min_guess_rate (float): Characters guessed in fewer games than this are removed.
+            Main characters are always kept.
+        explore_rate (float): Chance of a removed character being kept anyway in
+            this game. Defaults to 0.0.
+
+    Returns:
+        tuple[dict[str, int], dict[int, dict]]: The filtered dictionaries.
+    """
+    removed = {
+        idx
+        for idx, infos in map_index_to_infos.items()
+        if infos["role"] != "MAIN"
+        and guess_rates.get(infos.get("id"), 1.0) < min_guess_rate
+        and random.random() >= explore_rate
+    }
+    if not removed:
+        return map_char_and_names, map_index_to_infos
+
+    return (
+        {name: idx for name, idx in map_char_and_names.items() if idx not in removed},
+        {idx: infos for idx, infos in map_index_to_infos.items() if idx not in removed},
+    )
+
+
 def prepare_for_game_anilist(
-    anime_id: int = 12189, favourite_cut: int = 5
+    anime_id: int = 12189,
+    favourite_cut: int = 5,
+    guess_rates: Optional[dict[int, float]] = None,
+    min_guess_rate: float = 0.0,
+    explore_rate: float = 0.0,
 ) -> tuple[dict[str, int], dict[int, list[str]]]:
     """
     Prepares character data for a game by mapping character names to their indices and vice versa.
@@ -214,6 +686,12 @@ def prepare_for_game_anilist(
         anime_id (int): The id of the anime for which to prepare character data. Defaults to 12189 ("Hyouka").
         favourite_cut (int): The minimum amount of favourites a character must have to enter the game. Defaults to 5.
             This is done to prevent characters that appears 1 time in the show and thus are almost impossible to remember.
+        guess_rates (Optional[dict[int, float]]): Share of games in which each character (by AniList id) was
+            guessed by players, see `CharacterStat`. Defaults to None (no difficulty cut).
+        min_guess_rate (float): Non-main characters guessed in fewer games than this are removed, alongside the
+            favourite cut. Defaults to 0.0.
+        explore_rate (float): Chance of each character removed by the difficulty cut being kept anyway, see
+            `apply_difficulty_cut`. Defaults to 0.0.
 
     Returns:
         tuple[dict[str, int], dict[int, list[str]]]: A tuple containing two dictionaries:
@@ -225,6 +703,29 @@ def prepare_for_game_anilist(
         - Each character can have multiple name representations, which are stored in the resulting dictionaries.
         - Last name (family name) is removed to avoid collisions.
     """
+    # compiled indexes are reused as long as the cached cast does not change
+    version = characters_version(anime_id)
+    if version is not None:
+        cached = warm_cache.get(f"game:v2:{anime_id}:{favourite_cut}:{version}")
+        if cached is not None:
+            metrics.record_cache("game_index", "hit")
+            map_char_and_names, map_index_to_infos = cached
+            # copies, the cached ones are shared between requests
+            map_char_and_names = dict(map_char_and_names)
+            map_index_to_infos = {
+                int(idx): infos for idx, infos in map_index_to_infos.items()
+            }
+            if guess_rates and min_guess_rate > 0:
+                return apply_difficulty_cut(
+                    map_char_and_names,
+                    map_index_to_infos,
+                    guess_rates,
+                    min_guess_rate,
+                    explore_rate,
+                )
+            return map_char_and_names, map_index_to_infos
+    metrics.record_cache("game_index", "miss")
+
     res = get_characters_from_anime(anime_id=anime_id)["data"]
     map_char_and_names = {}
     map_index_to_infos = {}
@@ -233,10 +734,10 @@ def prepare_for_game_anilist(
         names = char.get("name", {})
 
         if not names:
-            print(f"No names found for character {char}")
+            logger.debug("No names found for character %s", char.get("id"))
             continue
 
-        print(names)
+        logger.debug("Character %s names: %s", char.get("id"), names)
         fn = names["first"] if names["first"] is not None else ""
         ln = names["last"] if names["last"] is not None else ""
         native = names["native"].replace(" ", "") if names["native"] is not None else ""
@@ -251,6 +752,7 @@ def prepare_for_game_anilist(
         all_names = [ln + " " + fn, fn + " " + ln, fn] + alternatives + [native]
         all_names = [name.strip().lower() for name in all_names if name]
         map_index_to_infos[idx] = {
+            "id": char["id"],
             "names": all_names,
             "gender": char["gender"],
             "favourites": char["favourites"],
@@ -261,4 +763,23 @@ def prepare_for_game_anilist(
         for option in all_names:
             map_char_and_names[option] = idx
 
+    version = characters_version(anime_id)
+    if version is not None:
+        # stored as JSON would see it (string indexes), for the snapshot file
+        warm_cache.put(
+            f"game:v2:{anime_id}:{favourite_cut}:{version}",
+            [
+                dict(map_char_and_names),
+                {str(idx): infos for idx, infos in map_index_to_infos.items()},
+            ],
+        )
+
+    if guess_rates and min_guess_rate > 0:
+        return apply_difficulty_cut(
+            map_char_and_names,
+            map_index_to_infos,
+            guess_rates,
+            min_guess_rate,
+            explore_rate,
+        )
     return map_char_and_names, map_index_to_infos
@@ -0,0 +1,296 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import threading
+from time import perf_counter
+from typing import Any, Coroutine, Optional
+
+import aiohttp
+
+from app.utils.anilist import (
+    AniListClientError,
+    merge_watchlist,
+    parse_character,
+    raise_for_client_error,
+)
+from app.utils.configs import status_list
+from app.utils.metrics import metrics
+from app.utils.queries import (
+    query_animes_from_user,
+    query_characters_from_anime,
+    query_updated_entries_from_user,
+    query_user_info,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAniListClient:
+    """
+    asyncio implementation of the AniList operations used by the app.
+
+    All requests share one aiohttp connection pool and at most `max_concurrency`
+    of them are in flight at the same time.
+
+    Args:
+        url (str): The GraphQL endpoint.
+        max_concurrency (int): Maximum number of concurrent requests.
+        max_retries (int): Attempts per request before giving up.
+        timeout (int): Timeout of a single request, in seconds.
+        wait_time (int): Base wait before retrying after a server error, in seconds.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        timeout: int = 15,
+        wait_time: int = 5,
+    ) -> None:
+        self.url = url
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.wait_time = wait_time
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # created lazily so that it is bound to the loop running the requests
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+    async def post(
+        self, query: str, variables: dict[str, Any], query_name: str
+    ) -> dict[str, Any]:
+        """
+        Sends a GraphQL request, retrying on network and server errors.
+
+        Args:
+            query (str): The GraphQL query.
+            variables (dict[str, Any]): The query variables.
+            query_name (str): The query type, used for metrics.
+
+        Raises:
+            AniListClientError: If AniList answered with a client error (4xx other
+                than 429), AniListNotFound for 404.
+            TimeoutError: If no successful response arrived after `max_retries` attempts.
+
+        Returns:
+            dict[str, Any]: The decoded response body.
+        """
+        session = self._get_session()
+        wait_time = self.wait_time
+
+        for attempt in range(self.max_retries):
+            if attempt:
+                metrics.record_retry(query_name)
+            try:
+                async with self._semaphore:
+                    started = perf_counter()
+                    async with session.post(
+                        self.url, json={"query": query, "variables": variables}
+                    ) as res:
+                        body = await res.read()
+                metrics.record_request(
+                    query_name, perf_counter() - started, len(body), res.ok
+                )
+
+                if res.ok:
+                    return json.loads(body)
+
+                try:
+                    raise_for_client_error(res.status, res.reason)
+                except AniListClientError:
+                    metrics.record_failure(query_name)
+                    raise
+
+                # lets try again but now waiting a little (useful when the server may be overloaded)
+                wait_time *= attempt + 1
+                logger.warning(
+                    "Received '%s' for link %s. Trying again after %ss.",
+                    res.reason,
+                    self.url,
+                    wait_time,
+                )
+                await asyncio.sleep(wait_time)
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(
+                    "Failed to request data from link %s. (attempt: %d): %s",
+                    self.url,
+                    attempt + 1,
+                    e,
+                )
+
+        metrics.record_failure(query_name)
+        logger.error(
+            "Failed to get response from url %s after %d attempts.",
+            self.url,
+            self.max_retries,
+        )
+        raise TimeoutError
+
+    async def user_info(self, username: str) -> dict[str, Any]:
+        res = await self.post(query_user_info, {"userName": username}, "user_info")
+        return res["data"]["User"]
+
+    async def _status_entries(
+        self, username: str, status: str, chunk_size: int
+    ) -> tuple[list[dict[str, Any]], int]:
+        # chunks of one status must be read in order (only hasNextChunk is known)
+        variables = {
+            "userName": username,
+            "chunk": 1,
+            "perChunk": chunk_size,
+            "status": status,
+        }
+        entries = []
+
+        while True:
+            res = await self.post(
+                query_animes_from_user, dict(variables), "animes_from_user"
+            )
+            data = res["data"]["MediaListCollection"]
+            for item in data["lists"]:
+                entries.extend(item["entries"])
+
+            if not data["hasNextChunk"]:
+                return entries, variables["chunk"]
+
+            variables["chunk"] += 1
+
+    async def watchlist(
+        self, username: str, chunk_size: int = 200
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Fetches every status of a watchlist concurrently."""
+        results = await asyncio.gather(
+            *(
+                self._status_entries(username, status, chunk_size)
+                for status in status_list
+            )
+        )
+        metrics.record_crawl("animes_from_user", sum(pages for _, pages in results))
+
+        return merge_watchlist(
+            {status: entries for status, (entries, _) in zip(status_list, results)}
+        )
+
+    async def updated_entries(
+        self, user_id: int, since: int, per_page: int = 50
+    ) -> list[dict[str, Any]]:
+        """Fetches the entries updated since `since`, page by page until older ones show up."""
+        variables = {"userId": user_id, "page": 1, "perPage": per_page}
+        updated = []
+
+        while True:
+            res = await self.post(
+                query_updated_entries_from_user, dict(variables), "updated_entries"
+            )
+            page = res["data"]["Page"]
+            entries = page["mediaList"]
+            updated.extend(entry for entry in entries if entry["updatedAt"] >= since)
+
+            if (
+                not page["pageInfo"]["hasNextPage"]
+                or not entries
+                or entries[-1]["updatedAt"] < since
+            ):
+                break
+
+            variables["page"] += 1
+
+        metrics.record_crawl("updated_entries", variables["page"])
+        return updated
+
+    async def _characters_page(self, anime_id: int, page: int) -> dict[str, Any]:
+        res = await self.post(
+            query_characters_from_anime,
+            {"animeId": anime_id, "page": page},
+            "characters_from_anime",
+        )
+        return res["data"]["Media"]["characters"]
+
+    async def characters(self, anime_id: int) -> list[dict[str, Any]]:
+        """
+        Fetches a whole cast: the first page tells how many pages there are, the
+        rest are then requested concurrently.
+        """
+        pages = [await self._characters_page(anime_id, 1)]
+        last_page = pages[0]["pageInfo"].get("lastPage") or 1
+
+        if pages[0]["pageInfo"]["hasNextPage"] and last_page > 1:
+            pages += await asyncio.gather(
+                *(
+                    self._characters_page(anime_id, page)
+                    for page in range(2, last_page + 1)
+                )
+            )
+
+        # lastPage is only an estimate, keep going if it was too low
+        while pages[-1]["pageInfo"]["hasNextPage"]:
+            pages.append(await self._characters_page(anime_id, len(pages) + 1))
+
+        metrics.record_crawl("characters_from_anime", len(pages))
+        return [parse_character(edge) for page in pages for edge in page["edges"]]
+
+
+class AniListFacade:
+    """
+    Blocking facade over AsyncAniListClient for the (synchronous) Flask routes.
+
+    Runs one event loop in a daemon thread; every request thread submits its
+    coroutine to that loop and waits for the result, so concurrent cold fetches
+    from many threads share the loop and the connection pool.
+
+    Args:
+        url (str): The GraphQL endpoint.
+        max_concurrency (int): Maximum number of concurrent requests.
+        timeout (float): Longest time a caller waits for a whole operation, in seconds.
+    """
+
+    def __init__(self, url: str, max_concurrency: int = 8, timeout: float = 120):
+        self.timeout = timeout
+        self.client = AsyncAniListClient(url, max_concurrency=max_concurrency)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="anilist-loop", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, coro: Coroutine) -> Any:
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(self.timeout)
+        except concurrent.futures.TimeoutError:
+            # stop the task too, or it keeps its semaphore slot and connection
+            future.cancel()
+            raise
+
+    def user_info(self, username: str) -> dict[str, Any]:
+        return self._run(self.client.user_info(username))
+
+    def watchlist(
+        self, username: str, chunk_size: int = 200
+    ) -> dict[str, list[dict[str, Any]]]:
+        return self._run(self.client.watchlist(username, chunk_size))
+
+    def updated_entries(
+        self, user_id: int, since: int, per_page: int = 50
+    ) -> list[dict[str, Any]]:
+        return self._run(self.client.updated_entries(user_id, since, per_page))
+
+    def characters(self, anime_id: int) -> list[dict[str, Any]]:
+        return self._run(self.client.characters(anime_id))
+
+    def close(self) -> None:
+        self._run(self.client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
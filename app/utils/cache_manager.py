@@ -0,0 +1,249 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Mapping, Optional
+
+from app.utils.configs import (
+    cache_ttl,
+    characters_path,
+    export_ttl,
+    games_path,
+    users_path,
+    watchlist_full_refresh,
+)
+from app.utils.negative_cache import negative_cache
+
+logger = logging.getLogger(__name__)
+
+_pruner: Optional[threading.Thread] = None
+
+
+@dataclass
+class CacheArea:
+    """
+    A directory of cache files managed as a whole.
+
+    Attributes:
+        name (str): Name shown in stats.
+        directory (str): Where the files are.
+        ttl (Optional[float]): Seconds after its last write past which a file is of
+            no use anymore, or None if only the disk budget removes files.
+        keep (tuple[str, ...]): File names that are never removed.
+        evict (bool): Whether the area counts towards the shared disk budget and
+            may be evicted from to meet it; False for areas whose owner keeps them
+            within a budget of their own.
+    """
+
+    name: str
+    directory: str
+    ttl: Optional[float] = None
+    keep: tuple[str, ...] = ()
+    evict: bool = True
+
+
+@dataclass
+class CacheEntry:
+    area: str
+    path: Path
+    size: int
+    accessed: float
+    modified: float
+
+
+def default_areas(config: Mapping[str, Any]) -> list[CacheArea]:
+    """
+    Returns the cache areas of an app.
+
+    Args:
+        config (Mapping[str, Any]): The Flask config.
+
+    Returns:
+        list[CacheArea]: AniList caches, game exports, thumbnails and, with the
+            filesystem backend, session files.
+    """
+    areas = [
+        # expired casts are never read again, they are refetched
+        CacheArea("characters", characters_path, ttl=cache_ttl * 86400),
+        # stale watchlists are the base of incremental refreshes until a full one
+        CacheArea(
+            "users",
+            users_path,
+            ttl=watchlist_full_refresh * 86400,
+            keep=("aliases.json",),
+        ),
+        CacheArea("exports", games_path, ttl=export_ttl),
+        # ThumbnailCache keeps it within IMAGE_PROXY_MAX_BYTES
+        CacheArea("thumbnails", config["IMAGE_PROXY_DIR"], evict=False),
+    ]
+    if config["SESSION_BACKEND"] == "filesystem":
+        areas.append(
+            CacheArea(
+                "sessions",
+                config["SESSION_FILE_DIR"],
+                ttl=config["PERMANENT_SESSION_LIFETIME"].total_seconds(),
+            )
+        )
+    return areas
+
+
+class CacheManager:
+    """
+    Keeps the on-disk caches within a disk budget.
+
+    Pruning first removes the entries whose TTL is over, then, while the total
+    size of the evictable areas is above `max_bytes`, their least recently
+    accessed entries (reads record accesses with `utils.touch`) until it is back
+    under 90% of it.
+
+    Args:
+        areas (list[CacheArea]): The managed directories.
+        max_bytes (int): Disk budget of all areas together.
+    """
+
+    def __init__(
+        self, areas: Optional[list[CacheArea]] = None, max_bytes: int = 1024**3
+    ) -> None:
+        self.configure(areas or [], max_bytes)
+
+    def configure(self, areas: list[CacheArea], max_bytes: int) -> None:
+        self.areas = areas
+        self.max_bytes = max_bytes
+
+    def entries(self) -> list[CacheEntry]:
+        """Lists the files of every area (temporary and kept files excluded)."""
+        entries = []
+        for area in self.areas:
+            directory = Path(area.directory)
+            if not directory.is_dir():
+                continue
+
+            with os.scandir(directory) as it:
+                for item in it:
+                    if (
+                        item.name in area.keep
+                        or item.name.endswith(".tmp")
+                        # bookkeeping files of the Flask-Session file store
+                        or item.name.startswith("__")
+                        or not item.is_file()
+                    ):
+                        continue
+                    try:
+                        stat = item.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append(
+                        CacheEntry(
+                            area.name,
+                            Path(item.path),
+                            stat.st_size,
+                            stat.st_atime,
+                            stat.st_mtime,
+                        )
+                    )
+        return entries
+
+    def stats(self) -> dict[str, Any]:
+        """Returns the number of files, their size and the oldest access per area."""
+        now = time.time()
+        areas = {
+            area.name: {"files": 0, "bytes": 0, "idle_s": 0.0} for area in self.areas
+        }
+        for entry in self.entries():
+            stats = areas[entry.area]
+            stats["files"] += 1
+            stats["bytes"] += entry.size
+            stats["idle_s"] = max(stats["idle_s"], now - entry.accessed)
+
+        return {
+            "max_bytes": self.max_bytes,
+            # what counts towards max_bytes
+            "bytes": sum(
+                areas[area.name]["bytes"] for area in self.areas if area.evict
+            ),
+            "areas": areas,
+        }
+
+    def prune(self, dry_run: bool = False) -> dict[str, int]:
+        """
+        Removes expired entries, then least recently used ones if over budget.
+
+        Args:
+            dry_run (bool): Only report what would be removed.
+
+        Returns:
+            dict[str, int]: Number of expired and evicted files and bytes freed.
+        """
+        now = time.time()
+        ttls = {area.name: area.ttl for area in self.areas}
+        evictable = {area.name for area in self.areas if area.evict}
+        kept = []
+        result = {"expired": 0, "evicted": 0, "bytes_freed": 0}
+
+        for entry in self.entries():
+            ttl = ttls[entry.area]
+            if ttl is not None and now - entry.modified > ttl:
+                self._remove(entry, dry_run)
+                result["expired"] += 1
+                result["bytes_freed"] += entry.size
+            elif entry.area in evictable:
+                kept.append(entry)
+
+        total = sum(entry.size for entry in kept)
+        if total > self.max_bytes:
+            target = self.max_bytes * 0.9
+            for entry in sorted(kept, key=lambda entry: entry.accessed):
+                if total <= target:
+                    break
+                self._remove(entry, dry_run)
+                total -= entry.size
+                result["evicted"] += 1
+                result["bytes_freed"] += entry.size
+
+        return result
+
+    def _remove(self, entry: CacheEntry, dry_run: bool) -> None:
+        if dry_run:
+            return
+        try:
+            entry.path.unlink()
+        except FileNotFoundError:
+            # already removed by another worker
+            pass
+
+
+def start_pruner(manager: CacheManager, interval: float) -> None:
+    """
+    Starts a daemon thread that periodically prunes the caches and forgets long
+    expired negative cache entries.
+
+    Calling this more than once per process has no effect.
+
+    Args:
+        manager (CacheManager): The manager to run.
+        interval (float): Seconds between prunes. Values <= 0 disable pruning.
+    """
+    global _pruner
+
+    if interval <= 0 or _pruner is not None:
+        return
+
+    def _run() -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                result = manager.prune()
+                result["negative"] = negative_cache.sweep()
+                if any(result.values()):
+                    logger.info("Pruned caches: %s", result)
+            except Exception:
+                logger.exception("Cache pruning failed")
+
+    _pruner = threading.Thread(target=_run, name="cache-pruner", daemon=True)
+    _pruner.start()
+
+
+# process-wide manager, configured by create_app
+cache_manager = CacheManager()
@@ -1,4 +1,19 @@
+import os
+
+anilist_url = os.environ.get("ANILIST_URL", "https://graphql.anilist.co")
 characters_path = "./data/characters/"
 users_path = "./data/users/"
+games_path = "./data/games/"  # game exports
+aliases_path = "./data/users/aliases.json"  # AniList username -> user id
 cache_ttl = 30  # in days
+# stale watchlists are refreshed with the entries updated since the last sync; a
+# full download (which also drops entries deleted on AniList) happens this often
+watchlist_full_refresh = 180  # in days
 status_list = ["COMPLETED", "CURRENT", "DROPPED", "PAUSED"]
+negative_cache_path = "./data/negative_cache.db"
+# base TTL (in seconds) of remembered failures, doubled every time one repeats
+negative_ttl = {"missing": 600, "empty": 600, "failing": 30}
+negative_max_ttl = 86400
+export_ttl = 3600  # in seconds, exports are downloaded right after being written
+# guesses of games completed longer ago are packed into one row per game
+guess_archive_after = 30  # in days
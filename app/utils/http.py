@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import json
+from typing import Any, Optional
+
+from flask import Flask, Response, request
+
+try:
+    import orjson
+except ImportError:  # in requirements.txt; the standard library encoder is the fallback
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # in requirements.txt; responses are gzipped without it
+    brotli = None
+
+
+def dumps(data: Any) -> bytes:
+    """Serializes a JSON payload, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def make_etag(*parts: Any) -> str:
+    """Builds an ETag value from whatever identifies a version of a response."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def not_modified(etag: Optional[str]) -> Optional[Response]:
+    """
+    Returns a 304 response if the client already holds this version of the resource.
+
+    Args:
+        etag (Optional[str]): The current ETag, or None if it is not known yet.
+
+    Returns:
+        Optional[Response]: The 304 response, or None if the payload must be sent.
+    """
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        return None
+
+    response = Response(status=304)
+    _set_validators(response, etag)
+    return response
+
+
+def json_response(data: Any, status: int = 200, etag: Optional[str] = None) -> Response:
+    """
+    Like `jsonify`, but faster for large payloads and optionally tagged with an ETag.
+
+    Args:
+        data (Any): The payload.
+        status (int): The HTTP status code.
+        etag (Optional[str]): Version of the payload (see `make_etag`).
+
+    Returns:
+        Response: The JSON response.
+    """
+    response = Response(dumps(data), status=status, mimetype="application/json")
+    if etag is not None:
+        _set_validators(response, etag)
+    return response
+
+
+def _set_validators(response: Response, etag: str) -> None:
+    # weak, since the same payload is also sent gzip or brotli encoded
+    response.set_etag(etag, weak=True)
+    # the browser keeps the payload but asks every time whether it changed
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+
+
+def _pick_encoding() -> Optional[str]:
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def init_compression(app: Flask) -> None:
+    """
+    Compresses JSON responses of at least COMPRESS_MIN_BYTES with brotli (when
+    installed and accepted by the client) or gzip.
+
+    Args:
+        app (Flask): The application.
+    """
+    if not app.config["COMPRESSION"]:
+        return
+
+    min_bytes = app.config["COMPRESS_MIN_BYTES"]
+    level = app.config["COMPRESS_LEVEL"]
+
+    @app.after_request
+    def compress_response(response: Response) -> Response:
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.mimetype != "application/json"
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        data = response.get_data()
+        encoding = _pick_encoding() if len(data) >= min_bytes else None
+        if encoding is None:
+            return response
+
+        if encoding == "br":
+            # brotli qualities go up to 11, gzip levels up to 9
+            data = brotli.compress(data, quality=min(11, level - 1))
+        else:
+            data = gzip.compress(data, compresslevel=level)
+
+        response.set_data(data)
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,290 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from app.utils.metrics import metrics
+from app.utils.utils import touch
+
+try:
+    from PIL import Image
+except ImportError:  # in requirements.txt; without it images are cached as is
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# magic numbers of the formats served by the AniList CDN
+_SIGNATURES = {
+    b"\xff\xd8\xff": "image/jpeg",
+    b"\x89PNG\r\n\x1a\n": "image/png",
+    b"GIF8": "image/gif",
+}
+
+
+class ImageNotAllowed(ValueError):
+    """Raised for image URLs outside the hosts the proxy may fetch from."""
+
+
+class ImageSource:
+    """Where the original images are fetched from."""
+
+    def fetch(self, url: str) -> bytes:
+        raise NotImplementedError
+
+
+class HttpImageSource(ImageSource):
+    """
+    Fetches images over HTTP(S) from a fixed set of hosts.
+
+    Args:
+        allowed_hosts (Iterable[str]): Host names (with the port, if not the default
+            one) images may be fetched from, e.g. "s4.anilist.co" or "127.0.0.1:8000".
+        timeout (int): Timeout of a single request, in seconds.
+        max_bytes (int): Largest image accepted.
+    """
+
+    def __init__(
+        self,
+        allowed_hosts: Iterable[str],
+        timeout: int = 10,
+        max_bytes: int = 5 * 1024 * 1024,
+    ) -> None:
+        self.allowed_hosts = {host.lower() for host in allowed_hosts}
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+
+    def fetch(self, url: str) -> bytes:
+        """
+        Downloads an image.
+
+        Raises:
+            ImageNotAllowed: If the URL is not an http(s) URL of an allowed host.
+            requests.RequestException: If the download failed.
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or (
+            parts.netloc.lower() not in self.allowed_hosts
+        ):
+            raise ImageNotAllowed(f"Images from '{parts.netloc}' are not proxied.")
+
+        with requests.get(url, timeout=self.timeout, stream=True) as res:
+            res.raise_for_status()
+            data = res.raw.read(self.max_bytes + 1, decode_content=True)
+
+        if len(data) > self.max_bytes:
+            raise ImageNotAllowed(f"Image {url} is larger than {self.max_bytes} bytes.")
+        return data
+
+
+def make_thumbnail(data: bytes, size: int) -> bytes:
+    """
+    Downscales an image so that it fits in a `size` x `size` box, as a JPEG.
+
+    Without Pillow (or for data Pillow cannot read) the image is returned unchanged.
+    """
+    if Image is None:
+        return data
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.thumbnail((size, size))
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            out = io.BytesIO()
+            img.save(out, format="JPEG", quality=85, optimize=True)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        # unreadable, unsupported or suspiciously large images
+        logger.warning("Could not downscale image, caching it as is.")
+        return data
+
+    return out.getvalue()
+
+
+def guess_mimetype(data: bytes) -> str:
+    """Returns the MIME type of an image from its first bytes."""
+    for signature, mimetype in _SIGNATURES.items():
+        if data.startswith(signature):
+            return mimetype
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+class ThumbnailCache:
+    """
+    On-disk cache of downscaled images, shared by all worker processes.
+
+    Files are named after a hash of the original URL and the thumbnail size, and
+    their modification time is bumped on every read; once the directory grows past
+    `max_bytes`, the least recently used files are removed.
+
+    Args:
+        directory (str): Where thumbnails are stored.
+        source (Optional[ImageSource]): Where originals are fetched from.
+        max_bytes (int): Disk budget of the cache.
+        size (int): Longest side of a thumbnail, in pixels.
+    """
+
+    def __init__(
+        self,
+        directory: str = "./data/thumbnails/",
+        source: Optional[ImageSource] = None,
+        max_bytes: int = 256 * 1024 * 1024,
+        size: int = 160,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._fetching: dict[str, threading.Lock] = {}
+        self.configure(directory, source, max_bytes, size)
+
+    def configure(
+        self,
+        directory: str,
+        source: Optional[ImageSource],
+        max_bytes: int,
+        size: int,
+    ) -> None:
+        with self._lock:
+            self.directory = Path(directory)
+            self.source = source
+            self.max_bytes = max_bytes
+            self.size = size
+            self._total_bytes: Optional[int] = None
+
+    def key(self, url: str) -> str:
+        return hashlib.sha256(f"{self.size}:{url}".encode()).hexdigest()
+
+    def _read(self, path: Path) -> Optional[bytes]:
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            # never cached, or just evicted by another process
+            return None
+        # marks the file as recently used, like the other caches (see cache_manager)
+        touch(path)
+        return data
+
+    def get(self, url: str) -> tuple[str, bytes]:
+        """
+        Returns a thumbnail, fetching and storing it on first use.
+
+        Args:
+            url (str): The URL of the original image.
+
+        Raises:
+            ImageNotAllowed: If the source refuses the URL.
+            requests.RequestException: If the original could not be fetched.
+
+        Returns:
+            tuple[str, bytes]: The cache key (usable as an ETag) and the image.
+        """
+        key = self.key(url)
+        path = self.directory / key
+
+        data = self._read(path)
+        if data is not None:
+            metrics.record_cache("thumbnails", "hit")
+            return key, data
+
+        # one download per image, however many requests ask for it at once
+        with self._lock:
+            fetching = self._fetching.setdefault(key, threading.Lock())
+
+        with fetching:
+            data = self._read(path)
+            if data is not None:
+                metrics.record_cache("thumbnails", "hit")
+                return key, data
+
+            metrics.record_cache("thumbnails", "miss")
+            try:
+                data = make_thumbnail(self.source.fetch(url), self.size)
+                self._store(path, data)
+            finally:
+                with self._lock:
+                    self._fetching.pop(key, None)
+
+        return key, data
+
+    def _store(self, path: Path, data: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with open(fd, mode="wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data)
+            over_budget = self._total_bytes > self.max_bytes
+
+        if over_budget:
+            self.evict()
+
+    def _files(self) -> list[tuple[Path, os.stat_result]]:
+        files = []
+        for path in self.directory.iterdir():
+            if path.suffix == ".tmp":
+                continue
+            try:
+                files.append((path, path.stat()))
+            except FileNotFoundError:
+                continue
+        return files
+
+    def _scan_size(self) -> int:
+        return sum(stat.st_size for _, stat in self._files())
+
+    def evict(self) -> int:
+        """
+        Removes the least recently used thumbnails until the cache is back under
+        90% of its budget, and returns how many were removed.
+        """
+        files = sorted(self._files(), key=lambda item: item[1].st_atime)
+        total = sum(stat.st_size for _, stat in files)
+        target = self.max_bytes * 0.9
+        removed = 0
+
+        for path, stat in files:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= stat.st_size
+            removed += 1
+
+        with self._lock:
+            self._total_bytes = total
+
+        logger.info("Evicted %d thumbnails (%d bytes left)", removed, total)
+        return removed
+
+    def stats(self) -> dict[str, int]:
+        """Returns the number of cached thumbnails and their total size."""
+        if not self.directory.exists():
+            return {"files": 0, "bytes": 0, "max_bytes": self.max_bytes}
+
+        files = self._files()
+        return {
+            "files": len(files),
+            "bytes": sum(stat.st_size for _, stat in files),
+            "max_bytes": self.max_bytes,
+        }
+
+
+# process-wide thumbnail cache, configured by create_app
+thumbnail_cache = ThumbnailCache()
@@ -0,0 +1,158 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from flask import Flask, g, has_request_context, request
+
+# every module logs through a child of this logger (logging.getLogger(__name__))
+ROOT_LOGGER = "app"
+
+# record attributes copied into the JSON payload when present
+CONTEXT_FIELDS = ("request_id", "game_id", "user_id")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Attaches the current request and game ids to every record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if has_request_context():
+            if getattr(record, "request_id", None) is None:
+                record.request_id = g.get("request_id")
+            if getattr(record, "game_id", None) is None:
+                record.game_id = g.get("game_id")
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            # getMessage applies the %-style arguments, so formatting only
+            # happens for records that passed the level checks
+            "message": record.getMessage(),
+        }
+
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                payload[field] = value
+
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # already formatted by JsonQueueHandler
+            payload["exc_info"] = record.exc_text
+
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class JsonQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records for a listener that formats them with JsonFormatter.
+
+    QueueHandler.prepare would format the whole record, traceback included, into
+    the message; this one only applies the %-style arguments and keeps the
+    traceback apart in `exc_text`, so the JSON has the same fields either way.
+    """
+
+    _formatter = JsonFormatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._formatter.formatException(record.exc_info)
+            # tracebacks hold frames, which must not outlive the request thread
+            record.exc_info = None
+        return record
+
+
+def parse_levels(spec: str) -> dict[str, str]:
+    """
+    Parses per-module levels from a string such as "app.utils.anilist=DEBUG,app.routes=WARNING".
+
+    Args:
+        spec (str): Comma-separated "logger=LEVEL" pairs.
+
+    Returns:
+        dict[str, str]: Logger names mapped to level names.
+    """
+    levels = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, level = item.split("=", 1)
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _stop_listener() -> None:
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(app: Flask) -> None:
+    """
+    Sets up JSON logging for the "app" logger tree using the app configuration.
+
+    Reads LOG_LEVEL (default level), LOG_LEVELS (per-module overrides) and LOG_QUEUE
+    (hand records to a background thread so request threads never block on I/O).
+    Also tags every request with an id, taken from the X-Request-ID header when present.
+
+    Args:
+        app (Flask): The application being created.
+    """
+    global _listener
+
+    root = logging.getLogger(ROOT_LOGGER)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    _stop_listener()
+
+    root.setLevel(app.config["LOG_LEVEL"])
+    root.propagate = False
+    for name, level in app.config["LOG_LEVELS"].items():
+        logging.getLogger(name).setLevel(level)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter())
+
+    if app.config["LOG_QUEUE"]:
+        log_queue: queue.Queue = queue.Queue(-1)
+        handler: logging.Handler = JsonQueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        _listener.start()
+        atexit.register(_stop_listener)
+    else:
+        handler = stream_handler
+
+    # the filter runs on the request thread, before the record is queued
+    handler.addFilter(RequestContextFilter())
+    root.addHandler(handler)
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+
+    @app.after_request
+    def expose_request_id(response):
+        request_id = g.get("request_id")
+        if request_id:
+            response.headers["X-Request-ID"] = request_id
+        return response
@@ -0,0 +1,252 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+# number of latency samples kept per query type to estimate percentiles
+LATENCY_WINDOW = 512
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    """
+    Returns the nearest-rank percentile of a list of samples.
+
+    Args:
+        samples (list[float]): The samples (not necessarily sorted).
+        pct (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile value, or 0.0 if there are no samples.
+    """
+    if not samples:
+        return 0.0
+
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class UpstreamMetrics:
+    """
+    Thread-safe counters and timers for upstream AniList calls and the local caches.
+
+    Upstream stats are kept per query type (e.g. "user_info", "characters_from_anime"),
+    cache stats per cache name (e.g. "users", "characters").
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Clears every counter."""
+        with self._lock:
+            self._queries: dict[str, dict[str, Any]] = {}
+            self._caches: dict[str, dict[str, int]] = {}
+            self._started_at = time.time()
+
+    def _query(self, query_name: str) -> dict[str, Any]:
+        # must be called with the lock held
+        stats = self._queries.get(query_name)
+        if stats is None:
+            stats = {
+                "requests": 0,
+                "errors": 0,
+                "retries": 0,
+                "failures": 0,
+                "bytes_received": 0,
+                "latency_total": 0.0,
+                "latency_max": 0.0,
+                "latencies": deque(maxlen=LATENCY_WINDOW),
+                "crawls": 0,
+                "pages": 0,
+                "max_pages": 0,
+            }
+            self._queries[query_name] = stats
+        return stats
+
+    def record_request(
+        self, query_name: str, latency: float, nbytes: int, ok: bool
+    ) -> None:
+        """
+        Records a single HTTP round trip to AniList.
+
+        Args:
+            query_name (str): The query type.
+            latency (float): Time spent waiting for the response, in seconds.
+            nbytes (int): Size of the response body.
+            ok (bool): Whether the response had a successful status code.
+        """
+        with self._lock:
+            stats = self._query(query_name)
+            stats["requests"] += 1
+            stats["errors"] += 0 if ok else 1
+            stats["bytes_received"] += nbytes
+            stats["latency_total"] += latency
+            stats["latency_max"] = max(stats["latency_max"], latency)
+            stats["latencies"].append(latency)
+
+    def record_retry(self, query_name: str) -> None:
+        """Records that a request is about to be attempted again."""
+        with self._lock:
+            self._query(query_name)["retries"] += 1
+
+    def record_failure(self, query_name: str) -> None:
+        """Records a request that gave up after exhausting its retries."""
+        with self._lock:
+            self._query(query_name)["failures"] += 1
+
+    def record_crawl(self, query_name: str, pages: int) -> None:
+        """
+        Records a paginated crawl (a cold fetch of a whole watchlist or cast).
+
+        Args:
+            query_name (str): The query type used for the pages.
+            pages (int): Number of pages (or chunks) requested.
+        """
+        with self._lock:
+            stats = self._query(query_name)
+            stats["crawls"] += 1
+            stats["pages"] += pages
+            stats["max_pages"] = max(stats["max_pages"], pages)
+
+    def record_cache(self, cache_name: str, outcome: str) -> None:
+        """
+        Records a cache lookup.
+
+        Args:
+            cache_name (str): The cache that was read (e.g. "users").
+            outcome (str): One of "hit", "miss" (no entry), "stale" (expired entry)
+                or "negative" (a recent failure is remembered, AniList is not asked).
+        """
+        with self._lock:
+            stats = self._caches.setdefault(
+                cache_name, {"hit": 0, "miss": 0, "stale": 0, "negative": 0}
+            )
+            stats[outcome] = stats.get(outcome, 0) + 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Returns a JSON-serializable copy of the current counters.
+
+        Returns:
+            dict[str, Any]: Upstream stats per query type and cache stats per cache name,
+                including derived averages, percentiles and hit rates.
+        """
+        with self._lock:
+            queries = {}
+            for name, stats in self._queries.items():
+                latencies = list(stats["latencies"])
+                requests_made = stats["requests"]
+                queries[name] = {
+                    "requests": requests_made,
+                    "errors": stats["errors"],
+                    "retries": stats["retries"],
+                    "failures": stats["failures"],
+                    "bytes_received": stats["bytes_received"],
+                    "latency_avg": stats["latency_total"] / requests_made
+                    if requests_made
+                    else 0.0,
+                    "latency_p50": _percentile(latencies, 50),
+                    "latency_p95": _percentile(latencies, 95),
+                    "latency_max": stats["latency_max"],
+                    "crawls": stats["crawls"],
+                    "pages": stats["pages"],
+                    "pages_per_crawl": stats["pages"] / stats["crawls"]
+                    if stats["crawls"]
+                    else 0.0,
+                    "max_pages": stats["max_pages"],
+                }
+
+            caches = {}
+            for name, stats in self._caches.items():
+                lookups = sum(stats.values())
+                caches[name] = {
+                    **stats,
+                    "lookups": lookups,
+                    "hit_rate": stats["hit"] / lookups if lookups else 0.0,
+                    "miss_rate": stats["miss"] / lookups if lookups else 0.0,
+                    "stale_rate": stats["stale"] / lookups if lookups else 0.0,
+                    "negative_rate": stats["negative"] / lookups if lookups else 0.0,
+                }
+
+            return {
+                # counters are per worker process
+                "pid": os.getpid(),
+                "since": self._started_at,
+                "uptime": time.time() - self._started_at,
+                "upstream": queries,
+                "caches": caches,
+            }
+
+    def summary(self) -> str:
+        """
+        Formats the counters as a short human-readable report.
+
+        Returns:
+            str: One line per query type and per cache.
+        """
+        snap = self.snapshot()
+        lines = [f"AniList metrics over the last {snap['uptime']:.0f}s"]
+
+        for name, stats in sorted(snap["upstream"].items()):
+            lines.append(
+                f"  {name}: {stats['requests']} requests, {stats['errors']} errors, "
+                f"{stats['retries']} retries, {stats['failures']} failures, "
+                f"{stats['bytes_received']} bytes, p50={stats['latency_p50']:.3f}s "
+                f"p95={stats['latency_p95']:.3f}s, {stats['crawls']} crawls "
+                f"({stats['pages_per_crawl']:.1f} pages/crawl)"
+            )
+
+        for name, stats in sorted(snap["caches"].items()):
+            lines.append(
+                f"  cache {name}: {stats['lookups']} lookups, "
+                f"hit={stats['hit_rate']:.0%} miss={stats['miss_rate']:.0%} "
+                f"stale={stats['stale_rate']:.0%} "
+                f"negative={stats['negative_rate']:.0%}"
+            )
+
+        return "\n".join(lines)
+
+
+# process-wide instance used by the AniList helpers
+metrics = UpstreamMetrics()
+
+_dump_thread: Optional[threading.Thread] = None
+
+
+def _log_summary(text: str) -> None:
+    logger.info("%s", text)
+
+
+def start_periodic_dump(
+    interval: float, sink: Optional[Callable[[str], Any]] = None
+) -> None:
+    """
+    Starts a daemon thread that periodically writes the metrics summary.
+
+    Calling this more than once per process has no effect.
+
+    Args:
+        interval (float): Seconds between dumps. Values <= 0 disable the dump.
+        sink (Optional[Callable[[str], Any]]): Receives the summary text.
+            Defaults to logging it at INFO level.
+    """
+    global _dump_thread
+
+    if interval <= 0 or _dump_thread is not None:
+        return
+
+    sink = sink or _log_summary
+
+    def _run() -> None:
+        while True:
+            time.sleep(interval)
+            sink(metrics.summary())
+
+    _dump_thread = threading.Thread(target=_run, name="metrics-dump", daemon=True)
+    _dump_thread.start()
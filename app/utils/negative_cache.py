@@ -0,0 +1,137 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from app.utils.configs import negative_cache_path, negative_max_ttl, negative_ttl
+
+
+@dataclass
+class NegativeEntry:
+    """
+    A remembered bad outcome for a lookup.
+
+    Attributes:
+        reason (str): "missing" (AniList answered 404), "empty" (nothing usable was
+            returned) or "failing" (the request kept failing).
+        failures (int): How many times in a row the outcome was seen.
+        expires_at (float): Unix time until which AniList should not be asked again.
+    """
+
+    reason: str
+    failures: int
+    expires_at: float
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, int(self.expires_at - time.time()))
+
+
+class NegativeCache:
+    """
+    Short-lived cache of lookups that recently failed, shared by all worker processes.
+
+    Every repeat of the same outcome doubles the entry's TTL (starting from
+    `negative_ttl[reason]`, capped at `negative_max_ttl`), so ids that keep failing
+    are retried less and less often.
+
+    Args:
+        path (str): Location of the SQLite file.
+    """
+
+    def __init__(self, path: str = negative_cache_path) -> None:
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        # one connection per thread, created (with the table) on first use
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS negative_cache ("
+                "kind TEXT NOT NULL, key TEXT NOT NULL, reason TEXT NOT NULL, "
+                "failures INTEGER NOT NULL, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (kind, key))"
+            )
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, kind: str, key: str | int) -> Optional[NegativeEntry]:
+        """
+        Returns the live entry for a lookup, if there is one.
+
+        Args:
+            kind (str): The kind of lookup (e.g. "user", "characters").
+            key (str | int): The looked up id or name.
+
+        Returns:
+            Optional[NegativeEntry]: The entry, or None if AniList may be asked.
+        """
+        row = (
+            self._connect()
+            .execute(
+                "SELECT reason, failures, expires_at FROM negative_cache "
+                "WHERE kind = ? AND key = ? AND expires_at > ?",
+                (kind, str(key), time.time()),
+            )
+            .fetchone()
+        )
+        return NegativeEntry(*row) if row else None
+
+    def add(self, kind: str, key: str | int, reason: str) -> NegativeEntry:
+        """
+        Records a bad outcome, backing off further if it repeats a previous one.
+
+        Args:
+            kind (str): The kind of lookup.
+            key (str | int): The looked up id or name.
+            reason (str): "missing", "empty" or "failing".
+
+        Returns:
+            NegativeEntry: The stored entry.
+        """
+        conn = self._connect()
+        with conn:
+            row = conn.execute(
+                "SELECT reason, failures FROM negative_cache WHERE kind = ? AND key = ?",
+                (kind, str(key)),
+            ).fetchone()
+            failures = row[1] + 1 if row and row[0] == reason else 1
+            ttl = min(negative_max_ttl, negative_ttl[reason] * 2 ** (failures - 1))
+            entry = NegativeEntry(reason, failures, time.time() + ttl)
+            conn.execute(
+                "INSERT OR REPLACE INTO negative_cache "
+                "(kind, key, reason, failures, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, str(key), reason, failures, entry.expires_at),
+            )
+        return entry
+
+    def clear(self, kind: str, key: str | int) -> None:
+        """Forgets a lookup after it succeeded."""
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM negative_cache WHERE kind = ? AND key = ?",
+                (kind, str(key)),
+            )
+
+    def sweep(self) -> int:
+        """
+        Removes entries that expired long ago and returns how many were removed.
+
+        Recently expired entries are kept so that their failure count still drives
+        the backoff if the same lookup fails again.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM negative_cache WHERE expires_at <= ?",
+                (time.time() - negative_max_ttl,),
+            )
+        return cursor.rowcount
+
+
+negative_cache = NegativeCache()
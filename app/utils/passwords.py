@@ -0,0 +1,147 @@
+import atexit
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class HasherBusy(Exception):
+    """Raised when too many password hashes are already waiting for the pool."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Too many logins in progress")
+        self.retry_after = retry_after
+
+
+def method_prefix(method: str) -> str:
+    """
+    Returns what hashes made with a method start with, with werkzeug's defaults
+    filled in (e.g. "pbkdf2" -> "pbkdf2:sha256:600000"), without hashing anything.
+
+    Args:
+        method (str): A `generate_password_hash` method.
+
+    Returns:
+        str: The part of the hashes before the first "$".
+    """
+    name, *args = method.split(":")
+    if name == "scrypt":
+        n, r, p = map(int, args) if args else (2**15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if name == "pbkdf2":
+        hash_name = args[0] if args else "sha256"
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    return method
+
+
+class PasswordHasher:
+    """
+    Hashes and checks passwords in a pool of worker processes.
+
+    Key derivation is CPU-bound and holds the GIL, so running it in the request
+    thread stalls every other request of the worker during a burst of logins.
+    The pool runs up to `workers` hashes in parallel on other cores; up to
+    `max_pending` callers wait at most `queue_timeout` seconds for their turn,
+    everyone else gets HasherBusy right away.
+
+    The pool is started on first use, so that forked server workers each get
+    their own (processes are spawned, not forked from a threaded server).
+
+    Args:
+        method (str): KDF and cost passed to `generate_password_hash`, e.g.
+            "pbkdf2:sha256:600000" or "scrypt:32768:8:1".
+        workers (int): Pool processes. 0 hashes in the calling thread.
+        max_pending (int): Hashes allowed to run or wait at once.
+        queue_timeout (float): Longest wait for the pool, in seconds.
+        retry_after (int): Seconds suggested to rejected clients.
+    """
+
+    def __init__(
+        self,
+        method: str = "pbkdf2:sha256:600000",
+        workers: int = 0,
+        max_pending: int = 16,
+        queue_timeout: float = 5.0,
+        retry_after: int = 2,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.configure(method, workers, max_pending, queue_timeout, retry_after)
+
+    def configure(
+        self,
+        method: str,
+        workers: int,
+        max_pending: int,
+        queue_timeout: float,
+        retry_after: int,
+    ) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+            self.method = method
+            self.workers = workers
+            self.queue_timeout = queue_timeout
+            self.retry_after = retry_after
+            self._slots = threading.BoundedSemaphore(max_pending)
+            self._method_prefix = method_prefix(method)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                atexit.register(self._pool.shutdown, wait=False)
+                logger.info(
+                    "Started password hashing pool (%d processes)", self.workers
+                )
+            return self._pool
+
+    def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.workers <= 0:
+            return func(*args)
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HasherBusy(self.retry_after)
+        try:
+            return self._get_pool().submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        """Returns a salted hash of a password, made with the configured method."""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        """Checks a password against a hash made with any method."""
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """
+        Tells whether a hash was made with another method or cost than the
+        configured ones (e.g. after PASSWORD_METHOD changed).
+
+        Args:
+            pwhash (str): A stored hash.
+
+        Returns:
+            bool: True if the password should be hashed again.
+        """
+        return pwhash.split("$", 1)[0] != self._method_prefix
+
+
+# process-wide hasher, configured by create_app
+password_hasher = PasswordHasher()
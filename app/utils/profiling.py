@@ -0,0 +1,184 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from flask import Flask, g, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+
+# <endpoint>.<duration in ms>ms.<unix time in ms>.prof
+_NAME = re.compile(r"^(?P<endpoint>.+)\.(?P<ms>\d+)ms\.(?P<at>\d+)\.prof$")
+
+
+class ProfileStore:
+    """
+    Directory of cProfile dumps (readable with `pstats` or snakeviz), one per
+    profiled request, named after the endpoint, duration and time of the request.
+
+    Only the `max_files` most recent dumps are kept. The directory is shared by
+    all workers, so listing it shows the samples of every process.
+
+    Args:
+        directory (Optional[str]): Where dumps are written, or None to disable it.
+        max_files (int): Dumps kept at most.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_files: int = 200) -> None:
+        self._lock = threading.Lock()
+        self.configure(directory, max_files)
+
+    def configure(self, directory: Optional[str], max_files: int) -> None:
+        self.directory = directory
+        self.max_files = max_files
+
+    def save(self, profile: cProfile.Profile, endpoint: str, duration: float) -> str:
+        """
+        Writes the dump of a request and removes the oldest ones over the limit.
+
+        Args:
+            profile (cProfile.Profile): The disabled profiler of the request.
+            endpoint (str): The Flask endpoint, e.g. "game.start_game".
+            duration (float): Duration of the request, in seconds.
+
+        Returns:
+            str: The file name of the dump.
+        """
+        name = (
+            f"{endpoint}.{round(duration * 1000)}ms.{time.time_ns() // 1_000_000}.prof"
+        )
+        directory = Path(self.directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(directory / name)
+
+        with self._lock:
+            dumps = sorted(
+                directory.glob("*.prof"), key=lambda path: path.stat().st_mtime
+            )
+            for path in dumps[: max(0, len(dumps) - self.max_files)]:
+                path.unlink(missing_ok=True)
+        return name
+
+    def samples(self) -> list[dict[str, Any]]:
+        """Lists the dumps, slowest first."""
+        if self.directory is None or not os.path.isdir(self.directory):
+            return []
+
+        samples = []
+        for name in os.listdir(self.directory):
+            match = _NAME.match(name)
+            if match is None:
+                continue
+            samples.append(
+                {
+                    "file": name,
+                    "endpoint": match["endpoint"],
+                    "duration_ms": int(match["ms"]),
+                    "at": int(match["at"]) / 1000,
+                }
+            )
+        samples.sort(key=lambda sample: sample["duration_ms"], reverse=True)
+        return samples
+
+    def top_functions(self, name: str, limit: int = 10) -> list[str]:
+        """Returns the `limit` functions of a dump with the most cumulative time."""
+        out = io.StringIO()
+        stats = pstats.Stats(os.path.join(self.directory, name), stream=out)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        # keep the table rows, without the header lines
+        lines = out.getvalue().splitlines()
+        start = next(
+            (i + 1 for i, line in enumerate(lines) if "ncalls" in line), len(lines)
+        )
+        return [line.strip() for line in lines[start:] if line.strip()]
+
+
+def _serializer(app: Flask) -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(app.secret_key, salt="profiling")
+
+
+def make_profile_token(app: Flask, issued_to: str) -> str:
+    """
+    Signs a token that, sent in the X-Profile header, gets a request profiled
+    whatever the sampling settings (valid for PROFILE_TOKEN_MAX_AGE seconds).
+    """
+    return _serializer(app).dumps({"by": issued_to})
+
+
+def _has_valid_token(app: Flask) -> bool:
+    token = request.headers.get(PROFILE_HEADER)
+    if not token:
+        return False
+    try:
+        _serializer(app).loads(token, max_age=app.config["PROFILE_TOKEN_MAX_AGE"])
+    except BadSignature:
+        logger.warning("Ignoring invalid %s header", PROFILE_HEADER)
+        return False
+    return True
+
+
+def init_profiling(app: Flask) -> None:
+    """
+    Profiles requests with cProfile and saves their dumps to PROFILE_DIR.
+
+    With PROFILING enabled, every request runs under cProfile, and its dump is kept
+    if it was drawn in the PROFILE_SAMPLE_RATE sample or took at least
+    PROFILE_THRESHOLD_MS (slow requests cannot be known in advance). A request with
+    a valid X-Profile token (see `make_profile_token`) is always profiled and kept,
+    even with PROFILING disabled.
+
+    Args:
+        app (Flask): The application.
+    """
+    profile_store.configure(app.config["PROFILE_DIR"], app.config["PROFILE_MAX_FILES"])
+
+    enabled = app.config["PROFILING"]
+    sample_rate = app.config["PROFILE_SAMPLE_RATE"]
+    threshold = app.config["PROFILE_THRESHOLD_MS"] / 1000
+
+    @app.before_request
+    def start_profile():
+        forced = _has_valid_token(app)
+        if not forced and not enabled:
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # another profiler is already active in this thread
+            return
+        g.profile = profile
+        g.profile_keep = forced or random.random() < sample_rate
+        g.profile_start = time.perf_counter()
+
+    @app.teardown_request
+    def stop_profile(exc):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return
+
+        profile.disable()
+        duration = time.perf_counter() - g.profile_start
+        if not g.profile_keep and duration < threshold:
+            return
+
+        try:
+            name = profile_store.save(profile, request.endpoint or "unknown", duration)
+            logger.info("Saved profile %s", name)
+        except OSError:
+            logger.exception("Saving profile failed")
+
+
+# process-wide store, configured by init_profiling
+profile_store = ProfileStore()
@@ -22,6 +22,7 @@ query ($animeId: Int!, $page: Int!) {
       },
       pageInfo {
         hasNextPage
+        lastPage
       }
     }
   }
@@ -44,6 +45,7 @@ query ($userName: String!, $chunk: Int!, $perChunk: Int!, $status: MediaListStat
         status,
         progress,
         private,
+        updatedAt,
         completedAt {
           year
           month
@@ -68,6 +70,40 @@ query ($userName: String!, $chunk: Int!, $perChunk: Int!, $status: MediaListStat
   }
 }
 """
+query_updated_entries_from_user = """
+query ($userId: Int!, $page: Int!, $perPage: Int!) {
+  Page (page: $page, perPage: $perPage) {
+    mediaList (userId: $userId, type: ANIME, sort: UPDATED_TIME_DESC) {
+      score(format: POINT_10_DECIMAL),
+      status,
+      progress,
+      private,
+      updatedAt,
+      completedAt {
+        year
+        month
+      },
+      media {
+        id,
+        title {
+          romaji,
+          english,
+          native
+        },
+        status,
+        episodes,
+        coverImage {
+          large
+        },
+        bannerImage
+      }
+    },
+    pageInfo {
+      hasNextPage
+    }
+  }
+}
+"""
 query_user_info = """
 query ($userName: String!) {
   User (name: $userName) {
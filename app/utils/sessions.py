@@ -0,0 +1,411 @@
+import json
+import logging
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Optional
+
+from flask import Flask
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+logger = logging.getLogger(__name__)
+
+
+def dumps(data: dict[str, Any]) -> bytes:
+    """
+    Serializes session data as zlib-compressed compact JSON.
+
+    Args:
+        data (dict[str, Any]): The session contents.
+
+    Returns:
+        bytes: The compressed payload.
+    """
+    return zlib.compress(
+        json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    )
+
+
+def loads(payload: bytes) -> dict[str, Any]:
+    """
+    Inverse of `dumps`.
+
+    Args:
+        payload (bytes): A payload produced by `dumps`.
+
+    Returns:
+        dict[str, Any]: The session contents.
+    """
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """A session whose contents live in a SessionStore, keyed by `sid`."""
+
+    def __init__(
+        self,
+        initial: Optional[dict[str, Any]] = None,
+        sid: Optional[str] = None,
+        new: bool = False,
+        expires_at: float = 0.0,
+    ) -> None:
+        def on_update(self):
+            self.modified = True
+
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+
+
+class SessionStore:
+    """
+    Storage for serialized sessions.
+
+    Subclasses keep (payload, expiry) pairs keyed by session id.
+    """
+
+    def load(self, sid: str) -> Optional[tuple[bytes, float]]:
+        """Returns (payload, expires_at) for a live session, or None."""
+        raise NotImplementedError
+
+    def save(self, sid: str, payload: bytes, expires_at: float) -> None:
+        """Creates or replaces a session."""
+        raise NotImplementedError
+
+    def touch(self, sid: str, expires_at: float) -> None:
+        """Moves the expiry of a session without rewriting its payload."""
+        raise NotImplementedError
+
+    def delete(self, sid: str) -> None:
+        raise NotImplementedError
+
+    def sweep(self) -> int:
+        """Removes expired sessions and returns how many were removed."""
+        raise NotImplementedError
+
+    def stats(self) -> dict[str, int]:
+        """Returns the number of stored sessions and their total payload size."""
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Keeps sessions in a dict of the current process.
+
+    Fastest option, but sessions are lost on restart and are not shared between
+    worker processes.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._data: dict[str, tuple[bytes, float]] = {}
+
+    def load(self, sid: str) -> Optional[tuple[bytes, float]]:
+        with self._lock:
+            entry = self._data.get(sid)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry
+
+    def save(self, sid: str, payload: bytes, expires_at: float) -> None:
+        with self._lock:
+            self._data[sid] = (payload, expires_at)
+
+    def touch(self, sid: str, expires_at: float) -> None:
+        with self._lock:
+            entry = self._data.get(sid)
+            if entry is not None:
+                self._data[sid] = (entry[0], expires_at)
+
+    def delete(self, sid: str) -> None:
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def sweep(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, (_, exp) in self._data.items() if exp <= now]
+            for sid in expired:
+                del self._data[sid]
+        return len(expired)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "sessions": len(self._data),
+                "bytes": sum(len(payload) for payload, _ in self._data.values()),
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Keeps sessions in a single SQLite file.
+
+    Survives restarts and is shared by every worker process on the host, without
+    one file per session.
+
+    Args:
+        path (str): Location of the database file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "sid TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # one connection per thread, reused across requests
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid: str) -> Optional[tuple[bytes, float]]:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT data, expires_at FROM sessions WHERE sid = ? AND expires_at > ?",
+                (sid, time.time()),
+            )
+            .fetchone()
+        )
+        return (row[0], row[1]) if row else None
+
+    def save(self, sid: str, payload: bytes, expires_at: float) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)",
+                (sid, payload, expires_at),
+            )
+
+    def touch(self, sid: str, expires_at: float) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE sessions SET expires_at = ? WHERE sid = ?", (expires_at, sid)
+            )
+
+    def delete(self, sid: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def sweep(self) -> int:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)
+            )
+        return cursor.rowcount
+
+    def stats(self) -> dict[str, int]:
+        count, size = (
+            self._connect()
+            .execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM sessions")
+            .fetchone()
+        )
+        return {"sessions": count, "bytes": size}
+
+
+def _reject_response(response) -> None:
+    # the view already ran (and committed), so its response is turned into an error
+    # in place: the body may have been compressed and tagged by after_request hooks
+    response.status_code = 500
+    response.headers.pop("Content-Encoding", None)
+    response.headers.pop("ETag", None)
+    response.mimetype = "application/json"
+    response.set_data(
+        json.dumps({"error": "Session too large to be saved, its changes were dropped"})
+    )
+
+
+class CompactSessionInterface(SessionInterface):
+    """
+    Server-side sessions stored as compressed JSON in a SessionStore.
+
+    Only the (optionally signed) session id travels in the cookie. Payloads are
+    rewritten only when the session changed; otherwise the expiry is refreshed
+    at most once per `refresh_interval` seconds.
+
+    Args:
+        store (SessionStore): Where sessions are kept.
+        max_bytes (int): Largest accepted serialized session. Bigger sessions are
+            not persisted (the previously stored state is kept) and the response is
+            replaced with a 500 error, so the client knows its state was dropped.
+        use_signer (bool): Sign the session id cookie with the app secret key.
+        refresh_interval (float): Minimum seconds between expiry refreshes.
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        max_bytes: int,
+        use_signer: bool = True,
+        refresh_interval: float = 60,
+    ) -> None:
+        self.store = store
+        self.max_bytes = max_bytes
+        self.use_signer = use_signer
+        self.refresh_interval = refresh_interval
+        self.rejected = 0
+
+    def _signer(self, app: Flask) -> Signer:
+        return Signer(app.secret_key, salt="flask-session", key_derivation="hmac")
+
+    def _new_session(self) -> ServerSideSession:
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def open_session(self, app: Flask, request) -> ServerSideSession:
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie:
+            return self._new_session()
+
+        sid = cookie
+        if self.use_signer:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                return self._new_session()
+
+        entry = self.store.load(sid)
+        if entry is None:
+            return self._new_session()
+
+        payload, expires_at = entry
+        try:
+            data = loads(payload)
+        except (zlib.error, ValueError):
+            logger.warning("Discarding unreadable session payload")
+            return self._new_session()
+
+        return ServerSideSession(data, sid=sid, expires_at=expires_at)
+
+    def save_session(self, app: Flask, session: ServerSideSession, response) -> None:
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        name = self.get_cookie_name(app)
+
+        if not session:
+            if session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if app.config.get("SESSION_PERMANENT", True) and not session.permanent:
+            session.permanent = True
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        expires = self.get_expiration_time(app, session)
+        expires_at = (
+            expires.timestamp()
+            if expires
+            else time.time() + app.permanent_session_lifetime.total_seconds()
+        )
+
+        if session.modified or session.new:
+            payload = dumps(dict(session))
+            if len(payload) > self.max_bytes:
+                self.rejected += 1
+                logger.error(
+                    "Session of %d bytes exceeds the %d bytes cap; not saved",
+                    len(payload),
+                    self.max_bytes,
+                )
+                _reject_response(response)
+                return
+            self.store.save(session.sid, payload, expires_at)
+        elif expires_at - session.expires_at >= self.refresh_interval:
+            self.store.touch(session.sid, expires_at)
+        else:
+            # neither the data nor (meaningfully) the expiry changed
+            return
+
+        sid = session.sid
+        if self.use_signer:
+            sid = self._signer(app).sign(sid).decode()
+
+        response.set_cookie(
+            name,
+            sid,
+            expires=expires,
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+_sweeper: Optional[threading.Thread] = None
+
+
+def start_sweeper(store: SessionStore, interval: float) -> None:
+    """
+    Starts a daemon thread that periodically removes expired sessions.
+
+    Calling this more than once per process has no effect.
+
+    Args:
+        store (SessionStore): The store to sweep.
+        interval (float): Seconds between sweeps. Values <= 0 disable sweeping.
+    """
+    global _sweeper
+
+    if interval <= 0 or _sweeper is not None:
+        return
+
+    def _run() -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                removed = store.sweep()
+                if removed:
+                    logger.info("Swept %d expired sessions", removed)
+            except Exception:
+                logger.exception("Session sweep failed")
+
+    _sweeper = threading.Thread(target=_run, name="session-sweeper", daemon=True)
+    _sweeper.start()
+
+
+def create_session_interface(app: Flask) -> CompactSessionInterface:
+    """
+    Builds the session interface selected by SESSION_BACKEND ("memory" or "sqlite").
+
+    Args:
+        app (Flask): The application being created.
+
+    Returns:
+        CompactSessionInterface: The interface, with its sweeper running.
+    """
+    backend = app.config["SESSION_BACKEND"]
+
+    if backend == "memory":
+        store: SessionStore = MemorySessionStore()
+    elif backend == "sqlite":
+        store = SQLiteSessionStore(app.config["SESSION_SQLITE_PATH"])
+    else:
+        raise ValueError(f"Unknown session backend '{backend}'")
+
+    start_sweeper(store, app.config["SESSION_SWEEP_INTERVAL"])
+
+    return CompactSessionInterface(
+        store,
+        max_bytes=app.config["SESSION_MAX_BYTES"],
+        use_signer=app.config["SESSION_USE_SIGNER"],
+    )
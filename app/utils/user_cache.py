@@ -0,0 +1,76 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Optional
+
+
+class UserCache:
+    """
+    Short-lived cache of the users loaded by Flask-Login, by id.
+
+    It holds plain column values rather than model instances, since an instance
+    belongs to the session of the request that loaded it; each request builds its
+    own instance from them (see `load_user`). Entries expire `ttl` seconds after
+    they are loaded and the least recently used ones are dropped past
+    `max_entries`.
+
+    The cache is per process: a change made by another worker is only seen once
+    the entry expires, so routes changing a user call `forget` and the TTL stays
+    short.
+
+    Args:
+        ttl (float): Seconds an entry is used for. 0 disables the cache.
+        max_entries (int): Users kept at most.
+    """
+
+    def __init__(self, ttl: float = 0.0, max_entries: int = 1024) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[int, tuple[float, dict[str, Any]]] = OrderedDict()
+        self.configure(ttl, max_entries)
+
+    def configure(self, ttl: float, max_entries: int) -> None:
+        with self._lock:
+            self.ttl = ttl
+            self.max_entries = max_entries
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get(self, user_id: int) -> Optional[dict[str, Any]]:
+        """Returns the cached column values of a user, if still fresh."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id: int, values: dict[str, Any]) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (monotonic() + self.ttl, values)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget(self, user_id: int) -> None:
+        """Drops a user, e.g. after they logged out or changed their profile."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# process-wide cache, configured by create_app
+user_cache = UserCache()
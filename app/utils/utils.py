@@ -1,10 +1,17 @@
 import json
+import logging
+import os
+import secrets
+import tempfile
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 from app.utils.configs import cache_ttl
 
+logger = logging.getLogger(__name__)
+
 
 def ensure_dir_exists(directory_path: str) -> None:
     """
@@ -16,7 +23,7 @@ def ensure_dir_exists(directory_path: str) -> None:
     directory = Path(directory_path)
     if not directory.exists():
         directory.mkdir(parents=True, exist_ok=True)
-        print(f"Directory '{directory_path}' created.")
+        logger.info("Directory '%s' created.", directory_path)
 
 
 def today_date_string() -> str:
@@ -44,6 +51,41 @@ def calculate_freshness(str_date: str) -> int:
     ).days
 
 
+def read_json(filepath: str | Path) -> dict[str, Any]:
+    """
+    Reads a JSON file, treating a missing or unreadable file as empty.
+
+    Args:
+        filepath (str | Path): The path to the file.
+
+    Returns:
+        dict[str, Any]: The decoded content, or an empty dictionary.
+    """
+    try:
+        with open(file=filepath, mode="r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def touch(filepath: str | Path) -> None:
+    """
+    Records an access to a cache file for LRU eviction (see `cache_manager`).
+
+    Only the access time is updated: the modification time tells when the data
+    was fetched and is part of the ETags of cached responses.
+
+    Args:
+        filepath (str | Path): The path to the cache file.
+    """
+    try:
+        # in nanoseconds, a float mtime would be rounded and change the ETags
+        st = os.stat(filepath)
+        os.utime(filepath, ns=(time.time_ns(), st.st_mtime_ns))
+    except OSError:
+        pass
+
+
 def read_from_cache(filepath: str) -> dict[str, Any]:
     """
     Reads data from a cache file.
@@ -55,13 +97,80 @@ def read_from_cache(filepath: str) -> dict[str, Any]:
         dict[str, Any]]: The data read from the cache file. If the cache is invalid,
             returns an empty dictionary.
     """
-    with open(file=filepath, mode="r+", encoding="utf-8") as f:
-        data = json.load(f)
+    with open(file=filepath, mode="r", encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except ValueError:
+            logger.warning("Cache %s is unreadable. Querying fresh data.", filepath)
+            return {}
+
         freshness = calculate_freshness(data["last_updated"])
 
         if freshness < cache_ttl:
-            print("Reading from cache...")
+            logger.debug("Reading from cache %s", filepath)
+            touch(filepath)
             return data
 
-        print(f"Cache invalid (older than {cache_ttl} days). Querying fresh data.")
+        logger.debug(
+            "Cache %s invalid (older than %d days). Querying fresh data.",
+            filepath,
+            cache_ttl,
+        )
         return {}
+
+
+def write_cache(filepath: str | Path, data: dict[str, Any]) -> None:
+    """
+    Writes data to a cache file atomically.
+
+    The data is written to a temporary file that then replaces the cache file, so
+    other processes reading the same cache never see a partially written file.
+
+    Args:
+        filepath (str | Path): The path to the cache file.
+        data (dict[str, Any]): The data to cache.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=Path(filepath).parent, suffix=".tmp")
+    try:
+        with open(fd, mode="w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_or_create_secret(filepath: str) -> str:
+    """
+    Returns the secret stored in a file, creating the file on first use.
+
+    Safe to call from several processes at once: only one secret is ever stored
+    and every caller gets that one.
+
+    Args:
+        filepath (str): The path to the secret file.
+
+    Returns:
+        str: The secret.
+    """
+    path = Path(filepath)
+    if path.exists():
+        secret = path.read_text().strip()
+        if secret:
+            return secret
+
+    # mkstemp creates the file readable by its owner only
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with open(fd, mode="w") as f:
+        f.write(secrets.token_hex(32))
+
+    try:
+        # link fails if another process created the file first
+        os.link(tmp_path, filepath)
+        logger.info("Created a new secret key in '%s'.", filepath)
+    except FileExistsError:
+        pass
+    finally:
+        os.unlink(tmp_path)
+
+    return path.read_text().strip()
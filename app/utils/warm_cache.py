@@ -0,0 +1,280 @@
+import atexit
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"AQWARM1\n"
+_HEADER_LEN = struct.Struct("<Q")
+
+_snapshotter: Optional[threading.Thread] = None
+
+
+def _prefix(key: str) -> str:
+    # "game:v2:1:25:<version>" -> "game:v2:1:25"
+    return key.rpartition(":")[0] or key
+
+
+class Snapshot:
+    """
+    Read-only view of a snapshot file.
+
+    The file holds a JSON index of `key -> [offset, length]` followed by one
+    zlib-compressed JSON blob per key. It is memory-mapped, so opening it only
+    reads the index; a blob is read and decoded when its key is first asked for.
+
+    Args:
+        path (str): Location of the snapshot file.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._map[: len(_MAGIC)] != _MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a snapshot file")
+
+        start = len(_MAGIC) + _HEADER_LEN.size
+        (header_len,) = _HEADER_LEN.unpack_from(self._map, len(_MAGIC))
+        self.index: dict[str, list[int]] = json.loads(
+            self._map[start : start + header_len]
+        )
+        self._base = start + header_len
+
+    def raw(self, key: str) -> Optional[bytes]:
+        """Returns the compressed blob of a key, if the snapshot has it."""
+        location = self.index.get(key)
+        if location is None:
+            return None
+        offset, length = location
+        return self._map[self._base + offset : self._base + offset + length]
+
+    def get(self, key: str) -> Optional[Any]:
+        blob = self.raw(key)
+        return None if blob is None else json.loads(zlib.decompress(blob))
+
+    def close(self) -> None:
+        self._map.close()
+
+
+def write_snapshot(path: str, blobs: dict[str, bytes]) -> None:
+    """
+    Writes compressed blobs to a snapshot file atomically.
+
+    Args:
+        path (str): Location of the snapshot file.
+        blobs (dict[str, bytes]): zlib-compressed JSON per key.
+    """
+    # offsets are relative to the end of the index
+    index = {}
+    offset = 0
+    for key, blob in blobs.items():
+        index[key] = [offset, len(blob)]
+        offset += len(blob)
+    header = json.dumps(index).encode()
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=Path(path).parent, suffix=".tmp")
+    try:
+        with open(fd, mode="wb") as f:
+            f.write(_MAGIC)
+            f.write(_HEADER_LEN.pack(len(header)))
+            f.write(header)
+            for blob in blobs.values():
+                f.write(blob)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class WarmCache:
+    """
+    In-process LRU of compiled data (game indexes, leaderboard), backed by a
+    snapshot file so that a restarted process does not start cold.
+
+    The snapshot is opened on the first cache miss, and entries are only decoded
+    when they are asked for. `save` writes the entries of this process, most
+    recently used first, topped up with the other entries of the current snapshot
+    (e.g. written by another worker) up to `max_entries`.
+
+    Keys end with the version of their value, after the last ":". Only one
+    version of a key is kept: putting one drops the others from memory, and `save`
+    skips the snapshot entries of a key that has a more recent version.
+
+    Args:
+        path (Optional[str]): Location of the snapshot file, or None to keep the
+            cache in memory only.
+        max_entries (int): Entries kept in memory and in the snapshot.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 256) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        # prefix -> the key of its current version
+        self._versions: dict[str, str] = {}
+        self.configure(path, max_entries)
+
+    def configure(self, path: Optional[str], max_entries: int) -> None:
+        with self._lock:
+            self.path = path
+            self.max_entries = max_entries
+            self._snapshot: Optional[Snapshot] = None
+            self._snapshot_loaded = False
+            self.hits = 0
+            self.snapshot_hits = 0
+            self.misses = 0
+
+    def _open_snapshot(self) -> Optional[Snapshot]:
+        if not self._snapshot_loaded:
+            self._snapshot_loaded = True
+            if self.path is not None and os.path.exists(self.path):
+                try:
+                    self._snapshot = Snapshot(self.path)
+                    logger.info(
+                        "Loaded snapshot %s (%d entries)",
+                        self.path,
+                        len(self._snapshot.index),
+                    )
+                except (OSError, ValueError) as e:
+                    logger.warning("Ignoring unreadable snapshot %s: %s", self.path, e)
+        return self._snapshot
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns a cached value, from memory or else from the snapshot.
+
+        Args:
+            key (str): The cache key (it should change whenever the value would).
+
+        Returns:
+            Optional[Any]: The value, or None if it has to be computed.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            snapshot = self._open_snapshot()
+            value = snapshot.get(key) if snapshot is not None else None
+            if value is None:
+                self.misses += 1
+                return None
+
+            self.snapshot_hits += 1
+            self._put(key, value)
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        """Caches a JSON-serializable value."""
+        with self._lock:
+            self._put(key, value)
+
+    def _put(self, key: str, value: Any) -> None:
+        prefix = _prefix(key)
+        previous = self._versions.get(prefix)
+        if previous is not None and previous != key:
+            del self._entries[previous]
+        self._versions[prefix] = key
+
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            del self._versions[_prefix(evicted)]
+
+    def save(self) -> int:
+        """
+        Writes the snapshot file and returns the number of entries saved.
+        """
+        if self.path is None:
+            return 0
+
+        with self._lock:
+            entries = list(reversed(self._entries.items()))
+            snapshot = self._open_snapshot()
+
+        blobs = {
+            key: zlib.compress(json.dumps(value).encode()) for key, value in entries
+        }
+        if snapshot is not None:
+            # this process's version of a key is the one it last built or read;
+            # the snapshot index is in recency order too, so its first one wins
+            prefixes = {_prefix(key) for key in blobs}
+            for key in snapshot.index:
+                if len(blobs) >= self.max_entries:
+                    break
+                if _prefix(key) not in prefixes:
+                    prefixes.add(_prefix(key))
+                    blobs[key] = snapshot.raw(key)
+
+        write_snapshot(self.path, blobs)
+
+        with self._lock:
+            # the next miss maps the new file (the old mapping stays valid until then)
+            self._snapshot = None
+            self._snapshot_loaded = False
+
+        return len(blobs)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "snapshot_hits": self.snapshot_hits,
+                "misses": self.misses,
+                "snapshot": self.path,
+            }
+
+
+def _save_quietly(cache: WarmCache) -> None:
+    try:
+        saved = cache.save()
+        logger.debug("Saved %d entries to snapshot %s", saved, cache.path)
+    except Exception:
+        logger.exception("Saving snapshot %s failed", cache.path)
+
+
+def start_snapshotter(cache: WarmCache, interval: float) -> None:
+    """
+    Saves the snapshot when the process exits and, from a daemon thread, every
+    `interval` seconds.
+
+    Calling this more than once per process has no effect.
+
+    Args:
+        cache (WarmCache): The cache to save.
+        interval (float): Seconds between saves. Values <= 0 disable periodic saves.
+    """
+    global _snapshotter
+
+    if cache.path is None or _snapshotter is not None:
+        return
+
+    atexit.register(_save_quietly, cache)
+
+    def _run() -> None:
+        while interval > 0:
+            time.sleep(interval)
+            _save_quietly(cache)
+
+    _snapshotter = threading.Thread(target=_run, name="snapshotter", daemon=True)
+    _snapshotter.start()
+
+
+# process-wide cache, configured by create_app
+warm_cache = WarmCache()
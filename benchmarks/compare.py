@@ -0,0 +1,59 @@
+"""
+Compares two benchmark result files.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Exits with status 1 when any scenario's p50 or p99 latency grew, or its
+throughput dropped, by more than the threshold percentage.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# metric name -> True when bigger is better
+METRICS = {"throughput_rps": True, "p50_ms": False, "p99_ms": False}
+
+
+def change(before: float, after: float) -> float:
+    if not before:
+        return 0.0
+    return (after - before) / before * 100
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text())["results"]
+    candidate = json.loads(args.candidate.read_text())["results"]
+
+    regressions = []
+    print(
+        f"{'scenario':>18} {'metric':>15} {'baseline':>10} {'candidate':>10} {'change':>8}"
+    )
+    for scenario in sorted(baseline.keys() & candidate.keys()):
+        for metric, higher_is_better in METRICS.items():
+            before = baseline[scenario][metric]
+            after = candidate[scenario][metric]
+            delta = change(before, after)
+            worse = -delta if higher_is_better else delta
+            flag = ""
+            if worse > args.threshold:
+                flag = "  REGRESSION"
+                regressions.append((scenario, metric))
+            print(
+                f"{scenario:>18} {metric:>15} {before:10.2f} {after:10.2f} "
+                f"{delta:+7.1f}%{flag}"
+            )
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
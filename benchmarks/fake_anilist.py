@@ -0,0 +1,316 @@
+"""
+A local stand-in for the AniList GraphQL API.
+
+Replays responses recorded with `benchmarks/record.py` (one JSON file per query
+under a recordings directory). When no recording exists for a request, a
+deterministic synthetic response with the same shape is served instead, so the
+benchmarks run fully offline.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Optional
+
+PER_PAGE = 25  # characters per page, as in query_characters_from_anime
+UPDATED_AT = 1_600_000_000  # updatedAt of the oldest synthetic list entry
+STATUSES = ["COMPLETED", "CURRENT", "DROPPED", "PAUSED"]
+
+
+def recording_name(operation: str, variables: dict[str, Any]) -> str:
+    """
+    Returns the file name under which a response is recorded.
+
+    Args:
+        operation (str): One of "user", "watchlist", "updates" or "characters".
+        variables (dict[str, Any]): The GraphQL variables of the request.
+
+    Returns:
+        str: A file name such as "characters_12189_p2.json".
+    """
+    if operation == "user":
+        return f"user_{variables['userName'].lower()}.json"
+    if operation == "watchlist":
+        return (
+            f"watchlist_{variables['userName'].lower()}_"
+            f"{variables['status']}_c{variables['chunk']}.json"
+        )
+    if operation == "updates":
+        return f"updates_{variables['userId']}_p{variables['page']}.json"
+    return f"characters_{variables['animeId']}_p{variables['page']}.json"
+
+
+def classify(query: str) -> str:
+    """Maps a GraphQL query to the operation it performs."""
+    if "MediaListCollection" in query:
+        return "watchlist"
+    if "mediaList" in query:
+        return "updates"
+    if "characters" in query:
+        return "characters"
+    return "user"
+
+
+class SyntheticAniList:
+    """
+    Generates deterministic AniList-shaped responses.
+
+    Args:
+        characters_per_anime (int): Size of every cast.
+        entries_per_status (int): Watchlist entries for each list status.
+        chunk_size (int): Entries per MediaListCollection chunk.
+
+    Attributes:
+        recent_updates (int): How many entries were updated since the list was
+            last downloaded; raise it to emulate user activity between refreshes.
+    """
+
+    def __init__(
+        self,
+        characters_per_anime: int = 60,
+        entries_per_status: int = 150,
+        chunk_size: int = 200,
+    ) -> None:
+        self.characters_per_anime = characters_per_anime
+        self.entries_per_status = entries_per_status
+        self.chunk_size = chunk_size
+        self.recent_updates = 0
+
+    def characters(self, anime_id: int) -> list[dict[str, Any]]:
+        """Returns the full cast of an anime as character edges."""
+        edges = []
+        for i in range(self.characters_per_anime):
+            edges.append(
+                {
+                    "node": {
+                        "id": anime_id * 1000 + i,
+                        "name": {
+                            "first": f"Name{i}",
+                            "last": f"Family{anime_id % 97}x{i}",
+                            "native": f"名前{i}",
+                            "alternative": [f"Alias{i}"] if i % 3 == 0 else [],
+                        },
+                        "image": {
+                            "large": f"https://s4.anilist.co/file/anilistcdn/character/large/b{anime_id}{i}.png"
+                        },
+                        "gender": "Female" if i % 2 else "Male",
+                        "age": None,
+                        # sorted by favourites, like the real query
+                        "favourites": max(0, 500 - i * 9),
+                    },
+                    "role": "MAIN" if i < 4 else "SUPPORTING",
+                }
+            )
+        return edges
+
+    def user(self, username: str) -> dict[str, Any]:
+        return {
+            "data": {
+                "User": {
+                    "id": sum(map(ord, username.lower())) * 7919,
+                    "name": username,
+                    "about": None,
+                    "avatar": {"large": None},
+                    "options": {"titleLanguage": "ROMAJI"},
+                    "statistics": {
+                        "anime": {
+                            "count": self.entries_per_status * len(STATUSES),
+                            "meanScore": 75.0,
+                            "episodesWatched": 1000,
+                        }
+                    },
+                }
+            }
+        }
+
+    def watchlist_entries(self, status: str) -> list[dict[str, Any]]:
+        offset = STATUSES.index(status) * 100000 if status in STATUSES else 900000
+        entries = []
+        for i in range(self.entries_per_status):
+            media_id = offset + i + 1
+            entries.append(
+                {
+                    "score": round(10 - i / self.entries_per_status * 9, 1),
+                    "status": status,
+                    "progress": 12,
+                    "private": False,
+                    "updatedAt": UPDATED_AT + media_id,
+                    "completedAt": {"year": 2020, "month": 1},
+                    "media": {
+                        "id": media_id,
+                        "title": {
+                            "romaji": f"Anime {media_id}",
+                            "english": None,
+                            "native": None,
+                        },
+                        "status": "FINISHED",
+                        "episodes": 12,
+                        "coverImage": {
+                            "large": f"https://s4.anilist.co/file/anilistcdn/media/anime/cover/large/bx{media_id}.jpg"
+                        },
+                        "bannerImage": None,
+                    },
+                }
+            )
+        return entries
+
+    def updated_entries(self) -> list[dict[str, Any]]:
+        """Returns every list entry, most recently updated first."""
+        entries = [
+            entry for status in STATUSES for entry in self.watchlist_entries(status)
+        ]
+        entries.sort(key=lambda entry: entry["updatedAt"], reverse=True)
+        for entry in entries[: self.recent_updates]:
+            entry["updatedAt"] += 10_000_000
+            entry["progress"] += 1
+        return entries
+
+    def respond(self, operation: str, variables: dict[str, Any]) -> dict[str, Any]:
+        """Builds the response body for one request."""
+        if operation == "user":
+            return self.user(variables["userName"])
+
+        if operation == "watchlist":
+            per_chunk = variables.get("perChunk", self.chunk_size)
+            start = (variables["chunk"] - 1) * per_chunk
+            entries = self.watchlist_entries(variables["status"])
+            return {
+                "data": {
+                    "MediaListCollection": {
+                        "lists": [
+                            {
+                                "status": variables["status"],
+                                "entries": entries[start : start + per_chunk],
+                            }
+                        ],
+                        "hasNextChunk": start + per_chunk < len(entries),
+                    }
+                }
+            }
+
+        if operation == "updates":
+            per_page = variables["perPage"]
+            start = (variables["page"] - 1) * per_page
+            entries = self.updated_entries()
+            return {
+                "data": {
+                    "Page": {
+                        "mediaList": entries[start : start + per_page],
+                        "pageInfo": {"hasNextPage": start + per_page < len(entries)},
+                    }
+                }
+            }
+
+        edges = self.characters(variables["animeId"])
+        start = (variables["page"] - 1) * PER_PAGE
+        last_page = max(1, -(-len(edges) // PER_PAGE))
+        return {
+            "data": {
+                "Media": {
+                    "characters": {
+                        "edges": edges[start : start + PER_PAGE],
+                        "pageInfo": {
+                            "hasNextPage": variables["page"] < last_page,
+                            "lastPage": last_page,
+                        },
+                    }
+                }
+            }
+        }
+
+
+class FakeAniList:
+    """
+    Threaded HTTP server answering AniList GraphQL requests.
+
+    Args:
+        recordings_dir (Optional[Path]): Directory with recorded responses.
+        latency (float): Seconds to sleep before every response, to emulate the
+            round trip to the real API.
+        synthetic (Optional[SyntheticAniList]): Fallback for unrecorded requests.
+    """
+
+    def __init__(
+        self,
+        recordings_dir: Optional[Path] = None,
+        latency: float = 0.0,
+        synthetic: Optional[SyntheticAniList] = None,
+    ) -> None:
+        self.recordings_dir = recordings_dir
+        self.latency = latency
+        self.synthetic = synthetic or SyntheticAniList()
+        self.requests_served: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def respond(self, query: str, variables: dict[str, Any]) -> bytes:
+        """Returns the raw response body for a GraphQL request."""
+        operation = classify(query)
+        with self._lock:
+            self.requests_served[operation] = self.requests_served.get(operation, 0) + 1
+
+        if self.recordings_dir is not None:
+            recorded = self.recordings_dir / recording_name(operation, variables)
+            if recorded.exists():
+                return recorded.read_bytes()
+
+        return json.dumps(self.synthetic.respond(operation, variables)).encode()
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "FakeAniList":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if fake.latency:
+                    time.sleep(fake.latency)
+                body = fake.respond(payload["query"], payload.get("variables", {}))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(
+            target=self._server.serve_forever, name="fake-anilist", daemon=True
+        ).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a local AniList stand-in.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--recordings", type=Path, default=None)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeAniList(args.recordings, latency=args.latency_ms / 1000).start(
+        port=args.port
+    )
+    print(f"Fake AniList listening on {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
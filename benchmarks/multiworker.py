@@ -0,0 +1,198 @@
+"""
+Checks that the app behaves under several gunicorn worker processes.
+
+Usage:
+    python -m benchmarks.multiworker --workers 4 --clients 8
+
+Starts gunicorn (with gunicorn.conf.py) against the local AniList stand-in and a
+throwaway database and data directory, then has concurrent clients register,
+play a game and end it. Since consecutive requests land on different workers,
+any worker-local state (secret key, sessions, game data) shows up as 401s or
+"No active game" errors. Exits with status 1 if any request failed.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from benchmarks.fake_anilist import FakeAniList
+from benchmarks.run import REPO_ROOT
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(base_url: str, workers: int, timeout: float = 60) -> None:
+    """
+    Waits until every worker has answered a request, so that the load does not
+    hit a worker that is still booting.
+
+    Workers are told apart by the pid reported by the admin metrics endpoint, for
+    an admin account registered once the first worker is up.
+    """
+    deadline = time.time() + timeout
+    admin = requests.Session()
+    # a new connection per request, so requests are spread over the workers
+    admin.headers["Connection"] = "close"
+
+    registered = False
+    pids = set()
+    while time.time() < deadline:
+        try:
+            if not registered:
+                res = admin.post(
+                    f"{base_url}/api/register",
+                    json={"username": "mw_admin", "password": "multiworker"},
+                    timeout=5,
+                )
+                registered = res.status_code == 201
+            else:
+                res = admin.get(f"{base_url}/api/admin/metrics", timeout=5)
+                if res.ok:
+                    pids.add(res.json()["pid"])
+                    if len(pids) >= workers:
+                        return
+                    continue
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(
+        f"Only {len(pids)} of {workers} workers at {base_url} answered in time"
+    )
+
+
+def play(base_url: str, index: int, guesses: int) -> list[str]:
+    """Runs one user's session and returns a description of every failed request."""
+    failures = []
+    client = requests.Session()
+    # a new connection per request, so requests are spread over the workers
+    client.headers["Connection"] = "close"
+
+    def check(res: requests.Response, expected: int, step: str) -> bool:
+        if res.status_code != expected:
+            failures.append(f"client {index} {step}: {res.status_code} {res.text[:80]}")
+            return False
+        return True
+
+    res = client.post(
+        f"{base_url}/api/register",
+        json={
+            "username": f"mw_{index}",
+            "password": "multiworker",
+            "anilist_username": "MultiWorker",
+        },
+    )
+    if not check(res, 201, "register"):
+        return failures
+
+    check(client.get(f"{base_url}/api/user/profile"), 200, "profile")
+    check(client.get(f"{base_url}/api/animes"), 200, "animes")
+
+    res = client.post(
+        f"{base_url}/api/game/start",
+        json={"anime_id": 1 + index % 3, "anime_title": "Multi Worker"},
+    )
+    if not check(res, 201, "start"):
+        return failures
+
+    for i in range(guesses):
+        res = client.post(f"{base_url}/api/game/guess", json={"guess": f"nobody {i}"})
+        check(res, 200, f"guess {i}")
+
+    check(client.post(f"{base_url}/api/game/end"), 200, "end")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--guesses", type=int, default=20)
+    args = parser.parse_args()
+
+    fake = FakeAniList().start()
+    workdir = Path(tempfile.mkdtemp(prefix="anime-quiz-multiworker-"))
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+
+    env = {
+        **os.environ,
+        "ANILIST_URL": fake.url,
+        "DATABASE_URL": f"sqlite:///{workdir / 'multiworker.db'}",
+        "SESSION_BACKEND": "sqlite",
+        "WORKERS": str(args.workers),
+        "BIND": f"127.0.0.1:{port}",
+        "ADMIN_USERNAMES": "mw_0,mw_admin",
+        "LOG_LEVEL": "WARNING",
+        "PYTHONPATH": str(REPO_ROOT),
+    }
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-c",
+            str(REPO_ROOT / "gunicorn.conf.py"),
+            "app:create_app()",
+        ],
+        cwd=workdir,
+        env=env,
+    )
+
+    try:
+        wait_until_up(base_url, args.workers)
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            results = pool.map(
+                lambda i: play(base_url, i, args.guesses), range(args.clients)
+            )
+            failures = [failure for result in results for failure in result]
+
+        # the admin endpoint reports the pid of the worker that answered
+        admin = requests.Session()
+        admin.headers["Connection"] = "close"
+        admin.post(
+            f"{base_url}/api/login",
+            json={"username": "mw_0", "password": "multiworker"},
+        )
+        pids = set()
+        for _ in range(args.workers * 10):
+            res = admin.get(f"{base_url}/api/admin/metrics")
+            if res.ok:
+                pids.add(res.json()["pid"])
+            else:
+                failures.append(f"admin metrics: {res.status_code}")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        fake.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(
+        json.dumps(
+            {
+                "workers": args.workers,
+                "workers_seen": len(pids),
+                "clients": args.clients,
+                "failures": failures,
+            },
+            indent=2,
+        )
+    )
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Records real AniList responses for the benchmark stand-in.
+
+Usage:
+    python -m benchmarks.record --user SomeUser --anime-id 12189 --anime-id 20954
+
+Every request made by the app for those inputs is saved under the recordings
+directory with the file names expected by `benchmarks/fake_anilist.py`.
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import requests
+
+from app.utils.configs import anilist_url, status_list
+from app.utils.queries import (
+    query_animes_from_user,
+    query_characters_from_anime,
+    query_updated_entries_from_user,
+    query_user_info,
+)
+from benchmarks.fake_anilist import recording_name
+
+DEFAULT_RECORDINGS = Path(__file__).parent / "recordings"
+
+
+def record(query: str, operation: str, variables: dict, out_dir: Path) -> dict:
+    res = requests.post(
+        anilist_url, json={"query": query, "variables": variables}, timeout=30
+    )
+    res.raise_for_status()
+    (out_dir / recording_name(operation, variables)).write_bytes(res.content)
+    return res.json()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--user", action="append", default=[])
+    parser.add_argument("--anime-id", type=int, action="append", default=[])
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--out", type=Path, default=DEFAULT_RECORDINGS)
+    args = parser.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+
+    for username in args.user:
+        user = record(query_user_info, "user", {"userName": username}, args.out)
+        # the most recent updates, as asked by an incremental refresh
+        record(
+            query_updated_entries_from_user,
+            "updates",
+            {"userId": user["data"]["User"]["id"], "page": 1, "perPage": 50},
+            args.out,
+        )
+        for status in status_list:
+            chunk = 1
+            while True:
+                variables = {
+                    "userName": username,
+                    "chunk": chunk,
+                    "perChunk": args.chunk_size,
+                    "status": status,
+                }
+                data = record(query_animes_from_user, "watchlist", variables, args.out)
+                if not data["data"]["MediaListCollection"]["hasNextChunk"]:
+                    break
+                chunk += 1
+
+    for anime_id in args.anime_id:
+        page = 1
+        while True:
+            variables = {"animeId": anime_id, "page": page}
+            data = record(
+                query_characters_from_anime, "characters", variables, args.out
+            )
+            if not data["data"]["Media"]["characters"]["pageInfo"]["hasNextPage"]:
+                break
+            page += 1
+
+    print(json.dumps({"recorded_to": str(args.out)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Offline benchmark suite for the Flask backend.
+
+Usage:
+    python -m benchmarks.run --output bench_results.json
+
+Starts `create_app` against a throwaway database and data directory, with AniList
+replaced by the local stand-in from `benchmarks/fake_anilist.py`, and measures
+throughput and latency percentiles for the main endpoints. Results are written as
+JSON so runs of different versions can be compared with `benchmarks/compare.py`.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable
+
+from benchmarks.fake_anilist import FakeAniList, SyntheticAniList
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+ANILIST_USER = "BenchUser"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: list[float], errors: int, wall: float) -> dict[str, Any]:
+    """
+    Summarizes the latencies of one scenario.
+
+    Args:
+        samples (list[float]): Request latencies in seconds.
+        errors (int): Number of requests with an unexpected status code.
+        wall (float): Time spent in the timed requests, in seconds.
+
+    Returns:
+        dict[str, Any]: Count, throughput and latency statistics in milliseconds.
+    """
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "total_s": wall,
+        "throughput_rps": len(samples) / wall if wall else 0.0,
+        "mean_ms": sum(samples) / len(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples) * 1000 if samples else 0.0,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class Bench:
+    """
+    Runs the benchmark scenarios against one app instance.
+
+    Args:
+        app: The Flask application.
+        fake (FakeAniList): The running AniList stand-in.
+        iterations (int): Requests per scenario.
+        guesses (int): Requests in the guess stream.
+    """
+
+    def __init__(self, app, fake: FakeAniList, iterations: int, guesses: int) -> None:
+        self.app = app
+        self.fake = fake
+        self.iterations = iterations
+        self.guesses = guesses
+        self.results: dict[str, dict[str, Any]] = {}
+        self.clients = []
+
+    def measure(
+        self,
+        name: str,
+        count: int,
+        request_fn: Callable[[int], Any],
+        expected: tuple[int, ...] = (200,),
+        setup_fn: Callable[[int], Any] | None = None,
+    ) -> None:
+        """
+        Times `count` calls of `request_fn`, running `setup_fn` untimed before each one.
+        """
+        samples = []
+        errors = 0
+        for i in range(count):
+            if setup_fn is not None:
+                setup_fn(i)
+            started = perf_counter()
+            res = request_fn(i)
+            samples.append(perf_counter() - started)
+            if res.status_code not in expected:
+                errors += 1
+        self.results[name] = summarize(samples, errors, sum(samples))
+        print(
+            f"{name:>18}: {self.results[name]['throughput_rps']:8.1f} req/s  "
+            f"p50={self.results[name]['p50_ms']:7.2f}ms  "
+            f"p99={self.results[name]['p99_ms']:7.2f}ms  errors={errors}",
+            file=sys.stderr,
+        )
+
+    def reset_caches(self, kind: str) -> None:
+        """Forgets every cached AniList response of one kind ("users" or "characters")."""
+        shutil.rmtree(f"./data/{kind}", ignore_errors=True)
+        os.makedirs(f"./data/{kind}", exist_ok=True)
+
+    def age_user_caches(self, days: int = 365) -> None:
+        """Makes every cached watchlist stale without changing its contents."""
+        old = time.strftime("%Y-%m-%d", time.localtime(time.time() - days * 86400))
+        for path in Path("./data/users").glob("*.json"):
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if "last_updated" in data:
+                data["last_updated"] = old
+                path.write_text(json.dumps(data), encoding="utf-8")
+
+    def cast_names(self, anime_id: int) -> list[str]:
+        """Returns a guessable name for every character of an anime."""
+        names = []
+        page = 1
+        while True:
+            body = json.loads(
+                self.fake.respond("characters", {"animeId": anime_id, "page": page})
+            )
+            characters = body["data"]["Media"]["characters"]
+            for edge in characters["edges"]:
+                name = edge["node"]["name"]
+                names.append(f"{name['first'] or ''} {name['last'] or ''}".strip())
+            if not characters["pageInfo"]["hasNextPage"]:
+                return names
+            page += 1
+
+    def run_auth(self) -> None:
+        def register(i):
+            client = self.app.test_client()
+            self.clients.append(client)
+            return client.post(
+                "/api/register",
+                json={
+                    "username": f"bench_{i}",
+                    "password": "bench-password",
+                    "anilist_username": ANILIST_USER,
+                },
+            )
+
+        def login(i):
+            return self.clients[i].post(
+                "/api/login",
+                json={"username": f"bench_{i}", "password": "bench-password"},
+            )
+
+        self.measure("register", self.iterations, register, expected=(201,))
+        self.measure("login", self.iterations, login)
+
+    def run_animes(self) -> None:
+        client = self.clients[0]
+
+        self.measure(
+            "animes_cold",
+            self.iterations,
+            lambda i: client.get("/api/animes"),
+            setup_fn=lambda i: self.reset_caches("users"),
+        )
+        self.measure(
+            "animes_warm", self.iterations, lambda i: client.get("/api/animes")
+        )
+        # a client reloading the anime picker with the copy it already has
+        etag = client.get("/api/animes").headers.get("ETag", "")
+        self.measure(
+            "animes_revalidate",
+            self.iterations,
+            lambda i: client.get("/api/animes", headers={"If-None-Match": etag}),
+            expected=(304,),
+        )
+        # a stale watchlist where the user changed a few entries since the last sync
+        self.fake.synthetic.recent_updates = 5
+        self.measure(
+            "animes_refresh",
+            self.iterations,
+            lambda i: client.get("/api/animes"),
+            setup_fn=lambda i: self.age_user_caches(),
+        )
+
+    def start_game(self, client, anime_id: int):
+        return client.post(
+            "/api/game/start",
+            json={"anime_id": anime_id, "anime_title": f"Anime {anime_id}"},
+        )
+
+    def run_game_start(self) -> None:
+        client = self.clients[0]
+        warm_anime = 1
+        self.start_game(client, warm_anime)
+
+        self.measure(
+            "game_start_cold",
+            self.iterations,
+            lambda i: self.start_game(client, 500000 + i),
+            expected=(201,),
+        )
+        self.measure(
+            "game_start_warm",
+            self.iterations,
+            lambda i: self.start_game(client, warm_anime),
+            expected=(201,),
+        )
+
+    def run_guesses(self) -> None:
+        client = self.clients[0]
+        anime_id = 2
+        names = self.cast_names(anime_id)
+        state = {"left": []}
+
+        def next_guess(i):
+            if not state["left"]:
+                self.start_game(client, anime_id)
+                state["left"] = list(names)
+
+        def guess(i):
+            # two wrong guesses for every right one, like a typical player
+            if i % 3 == 2:
+                text = state["left"].pop(0)
+            else:
+                text = f"not a character {i}"
+            res = client.post("/api/game/guess", json={"guess": text})
+            if res.status_code == 200 and res.get_json()["completed"]:
+                state["left"] = []
+            return res
+
+        self.measure("guess", self.guesses, guess, setup_fn=next_guess)
+
+    def run_leaderboard(self) -> None:
+        # make sure there are completed games to rank
+        for client in self.clients[: min(len(self.clients), 5)]:
+            self.start_game(client, 3)
+            client.post("/api/game/end")
+
+        client = self.app.test_client()
+        self.measure(
+            "leaderboard",
+            self.iterations,
+            lambda i: client.get("/api/leaderboard"),
+        )
+
+    def run_all(self) -> dict[str, dict[str, Any]]:
+        self.run_auth()
+        self.run_animes()
+        self.run_game_start()
+        self.run_guesses()
+        self.run_leaderboard()
+        return self.results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--guesses", type=int, default=300)
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=20.0,
+        help="simulated AniList round trip per request",
+    )
+    parser.add_argument("--characters", type=int, default=60)
+    parser.add_argument("--entries-per-status", type=int, default=150)
+    parser.add_argument("--recordings", type=Path, default=None)
+    parser.add_argument("--label", default="")
+    args = parser.parse_args()
+
+    output = args.output.resolve()
+    synthetic = SyntheticAniList(
+        characters_per_anime=args.characters,
+        entries_per_status=args.entries_per_status,
+    )
+    fake = FakeAniList(
+        args.recordings, latency=args.latency_ms / 1000, synthetic=synthetic
+    ).start()
+
+    # the app reads these at import time
+    os.environ["ANILIST_URL"] = fake.url
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    workdir = Path(tempfile.mkdtemp(prefix="anime-quiz-bench-"))
+    os.chdir(workdir)
+    sys.path.insert(0, str(REPO_ROOT))
+
+    from app import create_app
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{workdir / 'bench.db'}"})
+
+    try:
+        results = Bench(app, fake, args.iterations, args.guesses).run_all()
+    finally:
+        fake.stop()
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "label": args.label,
+            "git_revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "guesses": args.guesses,
+            "latency_ms": args.latency_ms,
+            "characters": args.characters,
+            "entries_per_status": args.entries_per_status,
+            "upstream_requests": fake.requests_served,
+        },
+        "results": results,
+    }
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+# Gunicorn settings for serving the app with several worker processes:
+#   WORKERS=4 gunicorn "app:create_app()"
+# The secret key, sessions (SESSION_BACKEND=sqlite), the database and the AniList
+# caches in data/ are all shared between workers through the filesystem.
+import os
+
+bind = os.environ.get("BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("WORKERS", 1))
+threads = int(os.environ.get("THREADS", 4))
+timeout = int(os.environ.get("WORKER_TIMEOUT", 120))
+
+# every worker must start its own background threads (session sweeper, metrics
+# dump, async AniList loop), so the app is not loaded before forking
+preload_app = False
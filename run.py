@@ -1,7 +1,8 @@
 from app import create_app
 
-# Create the Flask application
-app = create_app()
-
 if __name__ == "__main__":
+    # Created here only, so that processes spawned by the app (the password
+    # hashing pool) do not build another app when they import this module.
+    # `flask --app run` finds the create_app factory instead.
+    app = create_app()
     app.run(debug=True, port=5000)